@@ -0,0 +1,46 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+database = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_POOL_SIZE,
+                              thread_name_prefix='database')
+
+
+def pass_through(execute, sql, params, many, context):
+    return execute(sql, params, many, context)
+
+
+def run_view(view, request, *args, **kwargs):
+    close_old_connections()
+    try:
+        with connection.execute_wrapper(
+                getattr(request, 'metrics_counter', pass_through)):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+    finally:
+        close_old_connections()
+
+
+def pooled(view):
+    @wraps(view)
+    async def pooled_view(request, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            database, partial(run_view, view, request, *args, **kwargs))
+    return pooled_view
+
+
+recipe_list = pooled(RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'}))
+recipe_detail = pooled(RecipeViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'}))
+ingredient_list = pooled(IngredientViewSet.as_view(
+    {'get': 'list', 'post': 'create'}))
+tag_list = pooled(TagViewSet.as_view({'get': 'list', 'post': 'create'}))
@@ -0,0 +1,77 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.transaction import on_commit
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+from .metrics import registry
+
+USER_FIELDS = ['id', 'email', 'username', 'first_name', 'last_name', 'role',
+               'is_active', 'is_staff', 'is_superuser']
+
+
+class SharedTokenCache:
+
+    def cache_key(self, key):
+        return f'auth-user:{sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        return cache.get(self.cache_key(key))
+
+    def set(self, key, values):
+        cache.set(self.cache_key(key), values,
+                  settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+    def delete_many(self, keys):
+        cache.delete_many([self.cache_key(key) for key in keys])
+
+
+token_caches = {
+    'shared': SharedTokenCache(),
+}
+
+
+def get_token_cache():
+    return token_caches.get(settings.AUTH_TOKEN_CACHE)
+
+
+def invalidate_tokens(keys):
+    tokens = get_token_cache()
+    if tokens is None:
+        return
+    keys = list(keys)
+    if keys:
+        on_commit(lambda: tokens.delete_many(keys))
+
+
+def cached_user(values):
+    fields = [field.attname for field in User._meta.concrete_fields
+              if field.attname in values]
+    return User.from_db(User.objects.db, fields,
+                        [values[field] for field in fields])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        tokens = get_token_cache()
+        if tokens is None:
+            return super().authenticate_credentials(key)
+        values = tokens.get(key)
+        if values is not None:
+            user = cached_user(values)
+            if user.is_active:
+                registry.auth_token_lookup('hit')
+                token = Token.from_db(
+                    Token.objects.db, ['key', 'user_id'], [key, user.id])
+                token.user = user
+                return user, token
+        registry.auth_token_lookup('miss')
+        user, token = super().authenticate_credentials(key)
+        tokens.set(key, {field: getattr(user, field)
+                         for field in USER_FIELDS})
+        return user, token
@@ -0,0 +1,137 @@
+import csv
+import io
+
+PDF_PAGE_WIDTH = 595
+PDF_PAGE_HEIGHT = 842
+PDF_MARGIN = 50
+PDF_FONT_SIZE = 11
+PDF_LINE_HEIGHT = 16
+PDF_LINES_PER_PAGE = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT
+PDF_ENCODING = 'cp1251'
+
+
+def format_amount(amount):
+    return f'{amount.normalize():f}'
+
+
+def format_row(row):
+    return (f'* {row["ingredient__name"]} '
+            f'({row["ingredient__measurement_unit"]})'
+            f' - {format_amount(row["amount_sum"])}')
+
+
+def render_text(rows):
+    for row in rows:
+        yield f'{format_row(row)}\n'
+
+
+def render_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['name', 'measurement_unit', 'amount'])
+    for row in rows:
+        writer.writerow([row['ingredient__name'],
+                         row['ingredient__measurement_unit'],
+                         format_amount(row['amount_sum'])])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def pdf_string(text):
+    raw = text.encode(PDF_ENCODING, errors='replace')
+    return (raw.replace(b'\\', b'\\\\')
+            .replace(b'(', b'\\(')
+            .replace(b')', b'\\)'))
+
+
+def cyrillic_glyph(letter):
+    code = ord(letter)
+    if letter in 'Ёё':
+        return f'afii{10023 + (code == 0x451) * 48}'
+    lower = code >= 0x430
+    offset = code - (0x430 if lower else 0x410)
+    return f'afii{10017 + 48 * lower + offset + (offset > 5)}'
+
+
+def pdf_font():
+    names = ' '.join(
+        f'/{cyrillic_glyph(bytes([code]).decode(PDF_ENCODING))}'
+        for code in range(192, 256))
+    return (f'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            f'/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            f'/Differences [168 /afii10023 184 /afii10071 192 {names}] >> >>'
+            ).encode()
+
+
+def pdf_page(lines):
+    y = PDF_PAGE_HEIGHT - PDF_MARGIN
+    content = [f'BT /F1 {PDF_FONT_SIZE} Tf {PDF_LINE_HEIGHT} TL '
+               f'{PDF_MARGIN} {y} Td'.encode()]
+    for line in lines:
+        content.append(b'(' + pdf_string(line) + b') Tj T*')
+    content.append(b'ET')
+    return b'\n'.join(content)
+
+
+def render_pdf(rows):
+    offsets = {}
+    written = 0
+
+    def write_object(number, body):
+        nonlocal written
+        offsets[number] = written
+        chunk = f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+        written += len(chunk)
+        return chunk
+
+    def write_page(lines):
+        content_number = len(offsets) + 2
+        page_number = content_number + 1
+        content = pdf_page(lines)
+        chunk = write_object(
+            content_number,
+            f'<< /Length {len(content)} >>\nstream\n'.encode()
+            + content + b'\nendstream')
+        chunk += write_object(
+            page_number,
+            f'<< /Type /Page /Parent 2 0 R '
+            f'/MediaBox [0 0 {PDF_PAGE_WIDTH} {PDF_PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R >> >> '
+            f'/Contents {content_number} 0 R >>'.encode())
+        pages.append(page_number)
+        return chunk
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    written = len(header)
+    yield header
+    yield write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield write_object(3, pdf_font())
+    pages = []
+    lines = []
+    for row in rows:
+        lines.append(format_row(row))
+        if len(lines) == PDF_LINES_PER_PAGE:
+            yield write_page(lines)
+            lines = []
+    if lines or not pages:
+        yield write_page(lines)
+    kids = ' '.join(f'{number} 0 R' for number in pages)
+    yield write_object(
+        2, f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'.encode())
+    xref = written
+    size = len(offsets) + 1
+    table = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+    table.extend(f'{offsets[number]:010d} 00000 n \n'
+                 for number in range(1, size))
+    table.append(f'trailer\n<< /Size {size} /Root 1 0 R >>\n'
+                 f'startxref\n{xref}\n%%EOF\n')
+    yield ''.join(table).encode()
+
+
+EXPORT_FORMATS = {
+    'txt': (render_text, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
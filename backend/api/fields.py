@@ -0,0 +1,26 @@
+import io
+
+from django.conf import settings
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework.serializers import ValidationError
+
+
+class RecipeImageField(Base64ImageField):
+
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str):
+            encoded = base64_data.rpartition(';base64,')[2]
+            if len(encoded) * 3 // 4 > settings.RECIPE_IMAGE_MAX_BYTES:
+                raise ValidationError('Слишком большой файл изображения.')
+        return super().to_internal_value(base64_data)
+
+    def get_file_extension(self, filename, decoded_file):
+        try:
+            with Image.open(io.BytesIO(decoded_file)) as image:
+                width, height = image.size
+        except Exception:
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise ValidationError('Слишком большое разрешение изображения.')
+        return super().get_file_extension(filename, decoded_file)
@@ -1,8 +1,28 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import CharFilter, FilterSet
-from django_filters.rest_framework.filters import (AllValuesMultipleFilter,
-                                                   BooleanFilter)
+from django_filters.rest_framework.filters import (BooleanFilter, ChoiceFilter,
+                                                   MultipleChoiceFilter,
+                                                   NumberFilter)
 
-from recipes.models import Ingredient, Recipe
+from recipes.cache import get_cached
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import search_recipes
+
+RECIPE_ORDERINGS = {
+    'new': ['-pub_date', '-id'],
+    'popular': ['-favorites_count', '-pub_date', '-id'],
+}
+CURSOR_ORDERINGS = ['new']
+
+
+def tag_ids():
+    return get_cached(
+        'tags', lambda: dict(Tag.objects.values_list('slug', 'id')),
+        part='ids')
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids()]
 
 
 class IngredientsSearchFilter(FilterSet):
@@ -16,23 +36,44 @@ class IngredientsSearchFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    author = NumberFilter(field_name='author_id')
+    tags = MultipleChoiceFilter(choices=tag_choices, method='get_tags')
     is_favorited = BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = BooleanFilter(
         method='get_is_in_shopping_cart')
+    search = CharFilter(method='get_search')
+    ordering = ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='get_ordering')
 
     class Meta:
         model = Recipe
         fields = ['author', 'tags',
                   'is_favorited',
-                  'is_in_shopping_cart']
+                  'is_in_shopping_cart', 'search', 'ordering']
+
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        ids = tag_ids()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=[ids[slug] for slug in value])))
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(in_favorite__user=self.request.user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                recipe_id=OuterRef('pk'), user=self.request.user)))
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(shopping_cart__user=self.request.user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                recipe_id=OuterRef('pk'), user=self.request.user)))
         return queryset
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
@@ -0,0 +1,191 @@
+import json
+import statistics
+from datetime import datetime, timezone
+from time import perf_counter
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import Follow, User
+
+ENDPOINTS = {
+    'recipes.list': (('get',), '/api/recipes/'),
+    'recipes.list.tags': (('get',), '/api/recipes/?tags={tag}&limit=20'),
+    'recipes.list.favorited': (('get',), '/api/recipes/?is_favorited=1'),
+    'recipes.list.cursor': (('get',), '/api/recipes/?cursor=&limit=20'),
+    'recipes.search': (('get',), '/api/recipes/?search={word}&limit=20'),
+    'recipes.pantry': (
+        ('get',), '/api/recipes/pantry/?ingredients={pantry}&limit=20'),
+    'recipes.feed': (('get',), '/api/recipes/feed/?limit=20'),
+    'recipes.feed.heavy': (('get',), '/api/recipes/feed/?limit=20'),
+    'recipes.retrieve': (('get',), '/api/recipes/{recipe}/'),
+    'recipes.favorite.toggle': (
+        ('post', 'delete'), '/api/recipes/{recipe}/favorite/'),
+    'recipes.shopping_cart.toggle': (
+        ('post', 'delete'), '/api/recipes/{recipe}/shopping_cart/'),
+    'recipes.shopping_cart.bulk': (
+        ('post',), '/api/recipes/shopping_cart/bulk/',
+        lambda params: [{'action': 'add', 'recipes': params['week']},
+                        {'action': 'remove', 'recipes': params['week']}]),
+    'recipes.favorite.bulk': (
+        ('post',), '/api/recipes/favorite/bulk/',
+        lambda params: [{'action': 'add', 'recipes': params['week']},
+                        {'action': 'remove', 'recipes': params['week']}]),
+    'recipes.download_shopping_cart': (
+        ('get',), '/api/recipes/download_shopping_cart/'),
+    'users.list': (('get',), '/api/users/'),
+    'users.subscriptions': (
+        ('get',), '/api/users/subscriptions/?recipes_limit=3'),
+    'tags.list': (('get',), '/api/tags/'),
+    'ingredients.search': (('get',), '/api/ingredients/?name={prefix}'),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку и число SQL-запросов основных эндпоинтов '
+            'на синтетических данных разного объёма.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='1000,10000',
+            help='Количество рецептов для каждого замера через запятую.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--label', default='',
+                            help='Метка отчёта, например хеш коммита.')
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='Замерить текущую базу без генерации данных.')
+        parser.add_argument(
+            '--feed-follows', type=int, default=2000,
+            help='Подписок у пользователя для замера recipes.feed.heavy.')
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help='Список эндпоинтов через запятую.')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.endpoints = options['endpoints'].split(',')
+        self.feed_follows = options['feed_follows']
+        report = {'label': options['label'],
+                  'created': datetime.now(timezone.utc).isoformat(),
+                  'database': connection.vendor,
+                  'repeat': self.repeat,
+                  'scales': {}}
+        setup_test_environment()
+        try:
+            with override_settings(QUERY_BUDGET_STRICT=False):
+                if options['current_db']:
+                    report['scales']['current'] = self.run_scale()
+                else:
+                    report['scales'] = self.run_scales(options)
+        finally:
+            teardown_test_environment()
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
+
+    def run_scales(self, options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        results = {}
+        try:
+            generated = 0
+            for scale in map(int, options['scales'].split(',')):
+                call_command('generate_data',
+                             recipes=scale - generated,
+                             users=max((scale - generated) // 10, 1),
+                             seed=options['seed'] + generated,
+                             verbosity=0)
+                generated = scale
+                results[str(scale)] = self.run_scale()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        return results
+
+    def client_for(self, user):
+        client = APIClient()
+        token, created = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def heavy_follower(self):
+        user, created = User.objects.get_or_create(
+            username='benchmark-feed',
+            defaults={'email': 'benchmark-feed@example.com'})
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author)
+             for author in User.objects.filter(
+                recipes__isnull=False).exclude(id=user.id).values_list(
+                'id', flat=True).distinct()[:self.feed_follows]],
+            ignore_conflicts=True)
+        return user
+
+    def run_scale(self):
+        user = User.objects.filter(
+            follower__isnull=False,
+            shopping_cart__isnull=False).first() or User.objects.first()
+        client = self.client_for(user)
+        clients = {}
+        if 'recipes.feed.heavy' in self.endpoints:
+            clients['recipes.feed.heavy'] = self.client_for(
+                self.heavy_follower())
+        params = {
+            'tag': Tag.objects.values_list('slug', flat=True).first(),
+            'recipe': Recipe.objects.exclude(
+                in_favorite__user=user).exclude(
+                shopping_cart__user=user).values_list(
+                'id', flat=True).first(),
+            'week': list(Recipe.objects.exclude(
+                in_favorite__user=user).exclude(
+                shopping_cart__user=user).values_list(
+                'id', flat=True)[:21]),
+            'prefix': Ingredient.objects.values_list(
+                'name', flat=True).first()[:2],
+            'pantry': ','.join(map(str, IngredientRecipe.objects.values_list(
+                'ingredient_id', flat=True).distinct()[:8])),
+            'word': (Recipe.objects.values_list(
+                'name', flat=True).first() or '').split(' ')[0],
+        }
+        results = {}
+        for name in self.endpoints:
+            methods, url, *payloads = ENDPOINTS[name]
+            results[name] = self.measure(
+                clients.get(name, client), methods, url.format(**params),
+                payloads[0](params) if payloads else [None])
+            self.stdout.write(f'{name}: {results[name]}')
+        return results
+
+    def measure(self, client, methods, url, payloads):
+        timings = []
+        queries = []
+        statuses = set()
+        for number in range(self.repeat):
+            method = methods[number % len(methods)]
+            payload = payloads[number % len(payloads)]
+            with CaptureQueriesContext(connection) as context:
+                started = perf_counter()
+                response = getattr(client, method)(
+                    url, payload, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            statuses.add(response.status_code)
+        return {'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(percentile(timings, 0.95), 3),
+                'queries': max(queries),
+                'statuses': sorted(statuses)}
@@ -0,0 +1,71 @@
+import json
+import statistics
+from datetime import datetime, timezone
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, token_caches
+from api.management.commands.benchmark_api import percentile
+from users.models import User
+
+MODES = {
+    'token': (TokenAuthentication, ''),
+    'cached.shared': (CachedTokenAuthentication, 'shared'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Замеряет накладные расходы аутентификации по токену на '
+            'запрос: без кэша и с общим кэшем.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100,
+                            help='Сколько разных токенов чередовать.')
+        parser.add_argument('--output', default='benchmark_auth.json')
+        parser.add_argument('--label', default='',
+                            help='Метка отчёта, например хеш коммита.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)[:options['users']]
+        keys = [Token.objects.get_or_create(user=user)[0].key
+                for user in users]
+        factory = APIRequestFactory()
+        requests = [factory.get('/', HTTP_AUTHORIZATION=f'Token {key}')
+                    for key in keys]
+        report = {'label': options['label'],
+                  'created': datetime.now(timezone.utc).isoformat(),
+                  'database': connection.vendor,
+                  'requests': options['requests'],
+                  'tokens': len(keys),
+                  'modes': {}}
+        for name, (authentication, backend) in MODES.items():
+            with override_settings(AUTH_TOKEN_CACHE=backend):
+                for tokens in token_caches.values():
+                    tokens.delete_many(keys)
+                report['modes'][name] = self.measure(
+                    authentication(), requests, options['requests'])
+            self.stdout.write(f'{name}: {report["modes"][name]}')
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
+
+    def measure(self, authentication, requests, count):
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for number in range(count):
+                request = Request(requests[number % len(requests)])
+                started = perf_counter()
+                authentication.authenticate(request)
+                timings.append((perf_counter() - started) * 1000)
+        return {'p50_ms': round(statistics.median(timings), 4),
+                'p95_ms': round(percentile(timings, 0.95), 4),
+                'queries_per_request': round(
+                    len(context.captured_queries) / count, 3)}
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import statistics
+from datetime import datetime, timezone
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.benchmark_api import percentile
+
+DEFAULT_PATHS = '/api/recipes/?limit=20,/api/tags/,/api/ingredients/?name=%D1%81'
+
+
+async def fetch(host, port, path, headers, options):
+    started = perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        payload = (f'GET {path} HTTP/1.1\r\nHost: {host}\r\n{headers}'
+                   f'Connection: close\r\n\r\n').encode()
+        pieces = max(options['write_pieces'], 1)
+        size = -(-len(payload) // pieces)
+        for start in range(0, len(payload), size):
+            writer.write(payload[start:start + size])
+            await writer.drain()
+            if options['write_delay']:
+                await asyncio.sleep(options['write_delay'])
+        status = int((await reader.readline()).split()[1])
+        while await reader.read(options['read_chunk']):
+            if options['read_delay']:
+                await asyncio.sleep(options['read_delay'])
+    finally:
+        writer.close()
+    return status, (perf_counter() - started) * 1000
+
+
+async def client(target, paths, headers, options, deadline, results):
+    host, port = target.hostname, target.port or 80
+    number = 0
+    while perf_counter() < deadline:
+        path = paths[number % len(paths)]
+        number += 1
+        try:
+            status, elapsed = await asyncio.wait_for(
+                fetch(host, port, path, headers, options),
+                options['timeout'])
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            results['errors'] += 1
+            continue
+        results['statuses'][status] = results['statuses'].get(status, 0) + 1
+        results['timings'].append(elapsed)
+
+
+async def run_target(target, paths, headers, options):
+    results = {'timings': [], 'errors': 0, 'statuses': {}}
+    started = perf_counter()
+    deadline = started + options['duration']
+    await asyncio.gather(*(
+        client(target, paths, headers, options, deadline, results)
+        for _ in range(options['concurrency'])))
+    duration = perf_counter() - started
+    timings = results['timings'] or [0]
+    return {'requests': len(results['timings']),
+            'errors': results['errors'],
+            'rps': round(len(results['timings']) / duration, 1),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'statuses': {str(status): count for status, count
+                         in sorted(results['statuses'].items())}}
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенные серверы (например, gunicorn с sync-воркерами '
+            'и ASGI) параллельными медленными клиентами и сравнивает '
+            'пропускную способность и хвостовые задержки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Серверы в виде имя=URL, например '
+                 'sync=http://127.0.0.1:8000 async=http://127.0.0.1:8001.')
+        parser.add_argument('--paths', default=DEFAULT_PATHS,
+                            help='Пути через запятую.')
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность замера в секундах.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--token', default='',
+                            help='Токен авторизации; без него запросы '
+                                 'анонимные и попадают в кэш ответов.')
+        parser.add_argument(
+            '--write-pieces', type=int, default=1,
+            help='На сколько частей клиент делит отправку запроса.')
+        parser.add_argument('--write-delay', type=float, default=0,
+                            help='Пауза между частями запроса, с.')
+        parser.add_argument('--read-chunk', type=int, default=65536)
+        parser.add_argument('--read-delay', type=float, default=0,
+                            help='Пауза между чтениями ответа, с.')
+        parser.add_argument('--output', default='benchmark_concurrency.json')
+        parser.add_argument('--label', default='',
+                            help='Метка отчёта, например хеш коммита.')
+
+    def handle(self, *args, **options):
+        targets = {}
+        for target in options['targets']:
+            name, _, url = target.partition('=')
+            if not url:
+                raise CommandError(f'Ожидается имя=URL: {target}.')
+            targets[name] = urlsplit(url)
+        paths = options['paths'].split(',')
+        headers = (f'Authorization: Token {options["token"]}\r\n'
+                   if options['token'] else '')
+        report = {'label': options['label'],
+                  'created': datetime.now(timezone.utc).isoformat(),
+                  'paths': paths,
+                  'settings': {key: options[key] for key in (
+                      'concurrency', 'duration', 'write_pieces',
+                      'write_delay', 'read_chunk', 'read_delay')},
+                  'targets': {}}
+        for name, target in targets.items():
+            report['targets'][name] = asyncio.run(
+                run_target(target, paths, headers, options))
+            self.stdout.write(f'{name}: {report["targets"][name]}')
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
@@ -0,0 +1,106 @@
+import json
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+
+from api.management.commands.benchmark_api import percentile
+from api.metrics import registry
+from foodgram_backend.db.pool import close_pool
+
+MODES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'POOL': {'MAX_SIZE': 0}},
+    'persistent': {'CONN_MAX_AGE': 60, 'POOL': {'MAX_SIZE': 0}},
+    'pool': {'CONN_MAX_AGE': 0, 'POOL': {'MAX_SIZE': None}},
+}
+
+
+def new_connections():
+    histogram = registry.acquire.get('new')
+    return sum(histogram.counts) if histogram else 0
+
+
+def request_cycle(requests):
+    timings = []
+    try:
+        for _ in range(requests):
+            started = perf_counter()
+            close_old_connections()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            close_old_connections()
+            timings.append((perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+    return timings
+
+
+class Command(BaseCommand):
+    help = ('Замеряет накладные расходы на соединение с БД за запрос '
+            'в режимах без переиспользования, с постоянными соединениями '
+            'и с пулом соединений процесса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help='Режимы через запятую.')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Запросов на поток.')
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--pool-size', type=int, default=0,
+                            help='Размер пула; по умолчанию число потоков.')
+        parser.add_argument('--output', default='benchmark_connections.json')
+        parser.add_argument('--label', default='',
+                            help='Метка отчёта, например хеш коммита.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Замер имеет смысл только для PostgreSQL.')
+        modes = options['modes'].split(',')
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные режимы: {", ".join(sorted(unknown))}.')
+        settings_dict = connections.settings[connection.alias]
+        original = {key: settings_dict.get(key) for key in (
+            'CONN_MAX_AGE', 'POOL')}
+        report = {'label': options['label'],
+                  'created': datetime.now(timezone.utc).isoformat(),
+                  'host': settings_dict['HOST'],
+                  'requests': options['requests'],
+                  'threads': options['threads'],
+                  'modes': {}}
+        try:
+            for mode in modes:
+                report['modes'][mode] = self.run_mode(
+                    settings_dict, MODES[mode], options)
+                self.stdout.write(f'{mode}: {report["modes"][mode]}')
+        finally:
+            connection.close()
+            close_pool(connection.alias)
+            settings_dict.update(original)
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
+
+    def run_mode(self, settings_dict, mode, options):
+        connection.close()
+        close_pool(connection.alias)
+        pool = dict(settings_dict.get('POOL') or {}, **mode['POOL'])
+        if pool['MAX_SIZE'] is None:
+            pool['MAX_SIZE'] = options['pool_size'] or options['threads']
+        settings_dict.update(CONN_MAX_AGE=mode['CONN_MAX_AGE'], POOL=pool)
+        opened = new_connections()
+        started = perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            timings = [timing for chunk in executor.map(
+                request_cycle, [options['requests']] * options['threads'])
+                for timing in chunk]
+        duration = perf_counter() - started
+        return {'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(percentile(timings, 0.95), 3),
+                'rps': round(len(timings) / duration, 1),
+                'connections_opened': new_connections() - opened}
@@ -0,0 +1,74 @@
+import json
+import statistics
+from datetime import datetime, timezone
+from time import perf_counter, process_time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.management.commands.benchmark_api import percentile
+from api.serializers import RecipeSerializer
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает затраты CPU на сериализацию страницы рецептов '
+            'из JSON-снимков и без них на текущей базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int,
+                            default=settings.PAGINATION_SIZE)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', default='benchmark_snapshots.json')
+        parser.add_argument('--label', default='',
+                            help='Метка отчёта, например хеш коммита.')
+
+    def handle(self, *args, **options):
+        call_command('refresh_snapshots', once=True, verbosity=0,
+                     stdout=self.stdout)
+        self.user = User.objects.filter(
+            shopping_cart__isnull=False).first() or User.objects.first()
+        self.limit = options['limit']
+        self.repeat = options['repeat']
+        report = {'label': options['label'],
+                  'created': datetime.now(timezone.utc).isoformat(),
+                  'database': connection.vendor,
+                  'repeat': self.repeat,
+                  'limit': self.limit,
+                  'modes': {}}
+        for mode, snapshots in (('snapshot', True), ('serializer', False)):
+            report['modes'][mode] = self.measure(snapshots)
+            self.stdout.write(f'{mode}: {report["modes"][mode]}')
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
+
+    def measure(self, snapshots):
+        cpu = []
+        timings = []
+        queries = []
+        for _ in range(self.repeat):
+            page = list(Recipe.objects.with_details(self.user)[:self.limit])
+            if not snapshots:
+                for recipe in page:
+                    recipe.snapshot = {}
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = self.user
+            with CaptureQueriesContext(connection) as context:
+                started = perf_counter()
+                cpu_started = process_time()
+                RecipeSerializer(
+                    page, many=True, context={'request': request}).data
+                cpu.append((process_time() - cpu_started) * 1000)
+                timings.append((perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        return {'cpu_p50_ms': round(statistics.median(cpu), 3),
+                'cpu_p95_ms': round(percentile(cpu, 0.95), 3),
+                'p50_ms': round(statistics.median(timings), 3),
+                'queries': max(queries)}
@@ -0,0 +1,44 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.transaction import atomic
+
+from api.serializers import SNAPSHOT_VERSION, RecipeSnapshotSerializer
+from recipes.models import Recipe
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает устаревшие JSON-снимки рецептов после изменения '
+            'рецептов, ингредиентов, тегов или профилей авторов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда устаревших снимков не останется.')
+
+    def handle(self, *args, **options):
+        refreshed = 0
+        while True:
+            close_old_connections()
+            count = self.refresh_batch(options['batch_size'])
+            refreshed += count
+            if count:
+                continue
+            if options['once']:
+                break
+            sleep(options['poll_interval'])
+        self.stdout.write(f'Обновлено снимков: {refreshed}.')
+
+    @atomic
+    def refresh_batch(self, batch_size):
+        recipes = list(Recipe.objects.select_for_update(
+            skip_locked=True).with_stale_snapshots(
+            SNAPSHOT_VERSION).order_by('id')[:batch_size])
+        if recipes:
+            RecipeSnapshotSerializer.store(recipes)
+        return len(recipes)
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+ACQUIRE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1, 2.5, 5)
+
+METRICS = {
+    'request_duration_seconds': ('Время обработки запроса.', TIME_BUCKETS),
+    'db_duration_seconds': ('Время SQL-запросов.', TIME_BUCKETS),
+    'render_duration_seconds': ('Время рендеринга ответа.', TIME_BUCKETS),
+    'db_queries': ('Количество SQL-запросов.', QUERY_BUCKETS),
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.total}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.histograms = defaultdict(dict)
+        self.budget_violations = defaultdict(int)
+        self.cache_results = defaultdict(int)
+        self.auth_results = defaultdict(int)
+        self.acquire = {}
+        self.pool_timeouts = 0
+
+    def observe(self, view, values):
+        with self.lock:
+            for metric, value in values.items():
+                histograms = self.histograms[metric]
+                if view not in histograms:
+                    histograms[view] = Histogram(METRICS[metric][1])
+                histograms[view].observe(value)
+
+    def violation(self, view):
+        with self.lock:
+            self.budget_violations[view] += 1
+
+    def cache_result(self, view, result):
+        with self.lock:
+            self.cache_results[view, result] += 1
+
+    def auth_token_lookup(self, result):
+        with self.lock:
+            self.auth_results[result] += 1
+
+    def connection_acquired(self, source, seconds):
+        with self.lock:
+            if source not in self.acquire:
+                self.acquire[source] = Histogram(ACQUIRE_BUCKETS)
+            self.acquire[source].observe(seconds)
+
+    def connection_timeout(self):
+        with self.lock:
+            self.pool_timeouts += 1
+
+    def export(self):
+        lines = []
+        with self.lock:
+            for metric, (description, buckets) in METRICS.items():
+                name = f'foodgram_{metric}'
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in sorted(
+                        self.histograms[metric].items()):
+                    lines.extend(histogram.samples(name, f'view="{view}"'))
+            name = 'foodgram_query_budget_violations_total'
+            lines.append(f'# HELP {name} Превышения бюджета SQL-запросов.')
+            lines.append(f'# TYPE {name} counter')
+            for view, count in sorted(self.budget_violations.items()):
+                lines.append(f'{name}{{view="{view}"}} {count}')
+            name = 'foodgram_response_cache_total'
+            lines.append(f'# HELP {name} Обращения к кэшу ответов.')
+            lines.append(f'# TYPE {name} counter')
+            for (view, result), count in sorted(self.cache_results.items()):
+                lines.append(
+                    f'{name}{{view="{view}",result="{result}"}} {count}')
+            name = 'foodgram_auth_token_cache_total'
+            lines.append(f'# HELP {name} Обращения к кэшу токенов '
+                         f'авторизации.')
+            lines.append(f'# TYPE {name} counter')
+            for result, count in sorted(self.auth_results.items()):
+                lines.append(f'{name}{{result="{result}"}} {count}')
+            name = 'foodgram_db_connection_acquire_seconds'
+            lines.append(f'# HELP {name} Время получения соединения с БД.')
+            lines.append(f'# TYPE {name} histogram')
+            for source, histogram in sorted(self.acquire.items()):
+                lines.extend(histogram.samples(name, f'source="{source}"'))
+            name = 'foodgram_db_pool_timeouts_total'
+            lines.append(f'# HELP {name} Ожидания соединения из пула, '
+                         f'завершившиеся таймаутом.')
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {self.pool_timeouts}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+
+
+def view_name(view_func, method):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    action = getattr(view_func, 'actions', {}).get(method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def query_budget(view_func, method):
+    cls = getattr(view_func, 'cls', None)
+    action = getattr(view_func, 'actions', {}).get(method.lower())
+    return getattr(cls, 'query_budgets', {}).get(action)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = self.start(request)
+        with connection.execute_wrapper(request.metrics_counter):
+            response = self.get_response(request)
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request):
+        started = self.start(request)
+        response = await self.get_response(request)
+        return self.finish(request, response, started)
+
+    def start(self, request):
+        request.metrics_view = None
+        request.metrics_budget = None
+        request.metrics_view_finished = None
+        request.metrics_counter = QueryCounter()
+        return perf_counter()
+
+    def finish(self, request, response, started):
+        counter = request.metrics_counter
+        finished = perf_counter()
+        if request.metrics_view is None:
+            return response
+        render = (finished - request.metrics_view_finished
+                  if request.metrics_view_finished else 0)
+        registry.observe(request.metrics_view, {
+            'request_duration_seconds': finished - started,
+            'db_duration_seconds': counter.duration,
+            'render_duration_seconds': render,
+            'db_queries': counter.count,
+        })
+        response['Server-Timing'] = (
+            f'db;dur={counter.duration * 1000:.1f};'
+            f'desc="{counter.count} queries", '
+            f'render;dur={render * 1000:.1f}, '
+            f'total;dur={(finished - started) * 1000:.1f}')
+        self.check_budget(request, counter.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func, request.method)
+        request.metrics_budget = query_budget(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        request.metrics_view_finished = perf_counter()
+        return response
+
+    def check_budget(self, request, count):
+        budget = request.metrics_budget
+        if budget is None or count <= budget:
+            return
+        registry.violation(request.metrics_view)
+        message = (f'{request.metrics_view}: {count} SQL-запросов '
+                   f'при бюджете {budget}.')
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def metrics_view(request):
+    return HttpResponse(registry.export(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,101 @@
+from hashlib import md5
+from time import monotonic, sleep
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from recipes.cache import get_cached, get_tokens, get_version
+
+from .metrics import registry
+
+RESPONSE_CACHE_POLL_INTERVAL = 0.05
+
+
+class ReferenceCacheMixin:
+    cache_name = None
+
+    def get_cached_data(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_serializer(queryset, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        version = get_version(self.cache_name)
+        etag = f'"{self.cache_name}-{version["token"]}"'
+        response = get_conditional_response(
+            request, etag=etag, last_modified=version['modified'])
+        if response is None:
+            response = Response(
+                get_cached(self.cache_name, self.get_cached_data))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version['modified'])
+        patch_cache_control(response, **settings.REFERENCE_CACHE_CONTROL)
+        return response
+
+
+class AnonymousCacheMixin:
+    response_cache_params = ()
+
+    def response_cacheable(self, request):
+        return (settings.RESPONSE_CACHE_TIMEOUT > 0
+                and not request.user.is_authenticated
+                and set(request.query_params)
+                <= set(self.response_cache_params))
+
+    def response_cache_key(self, request, tokens):
+        params = sorted((name, sorted(set(request.query_params.getlist(name))))
+                        for name in request.query_params)
+        digest = md5(repr([
+            request.scheme, request.get_host(), self.action,
+            sorted(self.kwargs.items()), params, sorted(tokens.items()),
+        ]).encode()).hexdigest()
+        return f'response:{type(self).__name__}:{digest}'
+
+    def cached_entry(self, key):
+        entry = cache.get(key)
+        if entry is None or get_tokens(
+                entry['dependencies']) != entry['dependencies']:
+            return None
+        return entry
+
+    def wait_for_entry(self, key):
+        deadline = monotonic() + settings.RESPONSE_CACHE_LOCK_WAIT
+        while monotonic() < deadline:
+            sleep(RESPONSE_CACHE_POLL_INTERVAL)
+            entry = self.cached_entry(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def cache_result(self, response, result):
+        registry.cache_result(f'{type(self).__name__}.{self.action}', result)
+        response['X-Cache'] = result.upper()
+        return response
+
+    def cached_response(self, request, names, compute,
+                        dependencies=lambda data: ()):
+        key = self.response_cache_key(request, get_tokens(names))
+        entry = self.cached_entry(key)
+        if entry is not None:
+            return self.cache_result(Response(entry['data']), 'hit')
+        lock = f'{key}:lock'
+        locked = cache.add(lock, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT)
+        if not locked:
+            entry = self.wait_for_entry(key)
+            if entry is not None:
+                return self.cache_result(Response(entry['data']), 'coalesced')
+        try:
+            response = compute()
+            if response.status_code == 200:
+                cache.set(key, {
+                    'data': response.data,
+                    'dependencies': get_tokens(dependencies(response.data)),
+                }, settings.RESPONSE_CACHE_TIMEOUT)
+        finally:
+            if locked:
+                cache.delete(lock)
+        return self.cache_result(response, 'miss')
@@ -1,7 +1,35 @@
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import QuerySet
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    page_size = settings.PAGINATION_SIZE
+
+
+class FeedPagination(CustomCursorPagination):
+    ordering = ['-pub_date', '-id']
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = settings.PAGINATION_SIZE
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (CustomCursorPagination.cursor_query_param
+                not in request.query_params
+                or not isinstance(queryset, QuerySet)
+                or getattr(view, 'cursor_ordering', None) is None):
+            self.cursor_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = CustomCursorPagination()
+        self.cursor_paginator.ordering = view.cursor_ordering
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.transaction import on_commit
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'following': (Follow, 'author_id'),
+}
+
+
+class UserRelations:
+
+    def __init__(self, user):
+        self.user = user
+        self.sets = {}
+
+    @classmethod
+    def for_request(cls, request):
+        relations = getattr(request, '_user_relations', None)
+        if relations is None or relations.user != request.user:
+            relations = cls(request.user)
+            request._user_relations = relations
+        return relations
+
+    def cache_key(self, kind):
+        return f'user-relations:{self.user.id}:{kind}'
+
+    def load(self, kind):
+        model, field = RELATIONS[kind]
+        return set(model.objects.filter(user=self.user).values_list(
+            field, flat=True))
+
+    def get(self, kind):
+        if kind in self.sets:
+            return self.sets[kind]
+        timeout = settings.USER_RELATIONS_CACHE_TIMEOUT
+        if timeout:
+            ids = cache.get_or_set(
+                self.cache_key(kind), lambda: self.load(kind), timeout)
+        else:
+            ids = self.load(kind)
+        self.sets[kind] = ids
+        return ids
+
+    def contains(self, kind, object_id):
+        return self.user.is_authenticated and object_id in self.get(kind)
+
+    def changed(self, kind, object_id, added):
+        key = self.cache_key(kind)
+        on_commit(lambda: cache.delete(key))
+        if kind in self.sets:
+            if added:
+                self.sets[kind].add(object_id)
+            else:
+                self.sets[kind].discard(object_id)
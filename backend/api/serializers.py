@@ -1,16 +1,28 @@
+from django.conf import settings
+from django.db.models import Manager, prefetch_related_objects
 from django.db.transaction import atomic
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import status
-from rest_framework.serializers import (IntegerField, ModelSerializer,
-                                        PrimaryKeyRelatedField,
-                                        SerializerMethodField,
+from rest_framework.serializers import (ChoiceField, FloatField, IntegerField,
+                                        ListField, ListSerializer,
+                                        ModelSerializer,
+                                        PrimaryKeyRelatedField, ReadOnlyField,
+                                        Serializer, SerializerMethodField,
                                         SlugRelatedField, ValidationError)
 
-from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Tag)
+from recipes.images import enqueue, variant_urls
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, ShoppingCart,
+                            ShoppingCartIngredient, Tag, snapshot_relations)
+from recipes.pantry import recipe_changed
+from recipes.signals import ingredient_rows_applied
 from users.models import Follow, User
 
+from .fields import RecipeImageField
+from .relations import UserRelations
+
+SNAPSHOT_VERSION = 1
+
 
 class UsersSerializer(UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
@@ -22,11 +34,10 @@ class UsersSerializer(UserSerializer):
                   'last_name', 'is_subscribed']
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Follow.objects.filter(user=user,
-                                      author=obj).exists())
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return UserRelations.for_request(
+            self.context.get('request')).contains('following', obj.id)
 
 
 class UserRegistrationSerializer(UserCreateSerializer):
@@ -72,10 +83,14 @@ class CreateRecipeIngredientSerializer(ModelSerializer):
 
 class ShortRecipeSerializer(ModelSerializer):
     image = Base64ImageField()
+    images = SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'images', 'cooking_time']
+
+    def get_images(self, obj):
+        return variant_urls(obj, self.context.get('request'))
 
 
 class IngredientRecipeSerializer(ModelSerializer):
@@ -98,33 +113,158 @@ class IngredientRecipeSerializer(ModelSerializer):
                   'amount']
 
 
-class RecipeSerializer(ModelSerializer):
+class SnapshotAuthorSerializer(ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['email', 'id',
+                  'username', 'first_name',
+                  'last_name']
+
+
+class RecipeSnapshotSerializer(ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     ingredients = IngredientRecipeSerializer(
         many=True,
         read_only=True,
         source='ingridients_recipe')
-    author = UsersSerializer(read_only=True)
+    author = SnapshotAuthorSerializer(read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = ['id', 'tags', 'author', 'ingredients',
+                  'name', 'text', 'cooking_time', 'servings']
+
+    def to_representation(self, instance):
+        return {**super().to_representation(instance),
+                'version': SNAPSHOT_VERSION}
+
+    @staticmethod
+    def is_fresh(recipe):
+        return recipe.snapshot.get('version') == SNAPSHOT_VERSION
+
+    @classmethod
+    def snapshot_of(cls, recipe):
+        if not cls.is_fresh(recipe):
+            prefetch_related_objects([recipe], *snapshot_relations())
+            recipe.snapshot = cls(recipe).data
+        return recipe.snapshot
+
+    @classmethod
+    def store(cls, recipes):
+        prefetch_related_objects(recipes, *snapshot_relations())
+        for recipe in recipes:
+            recipe.snapshot = cls(recipe).data
+        Recipe.objects.bulk_update(recipes, ['snapshot'])
+
+
+class SnapshotField(ReadOnlyField):
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, recipe):
+        return RecipeSnapshotSerializer.snapshot_of(recipe)[self.field_name]
+
+
+class SnapshotAuthorField(SnapshotField):
+
+    def to_representation(self, recipe):
+        return {**super().to_representation(recipe),
+                'is_subscribed': self.parent.get_author_subscribed(recipe)}
+
+
+class RecipeListSerializer(ListSerializer):
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_related_objects(
+            [recipe for recipe in recipes
+             if not RecipeSnapshotSerializer.is_fresh(recipe)],
+            *snapshot_relations())
+        return super().to_representation(recipes)
+
+
+class RecipeSerializer(ModelSerializer):
+    tags = SnapshotField()
+    ingredients = SnapshotField()
+    author = SnapshotAuthorField()
     is_in_shopping_cart = SerializerMethodField(read_only=True)
     is_favorited = SerializerMethodField(read_only=True)
+    images = SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = ['id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time']
+                  'name', 'image', 'images', 'text', 'cooking_time',
+                  'servings', 'favorites_count', 'shopping_cart_count']
+        list_serializer_class = RecipeListSerializer
+
+    def get_author_subscribed(self, obj):
+        if hasattr(obj, 'author_is_subscribed'):
+            return obj.author_is_subscribed
+        return UserRelations.for_request(
+            self.context.get('request')).contains('following', obj.author_id)
+
+    def get_images(self, obj):
+        return variant_urls(obj, self.context.get('request'))
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        return (user.is_authenticated
-                and Favorite.objects.filter(recipe=obj,
-                                            user=user).exists())
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return UserRelations.for_request(
+            self.context.get('request')).contains('favorites', obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        return (user.is_authenticated
-                and ShoppingCart.objects.filter(recipe=obj,
-                                                user=user).exists())
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return UserRelations.for_request(
+            self.context.get('request')).contains('shopping_cart', obj.id)
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    coverage = FloatField(read_only=True)
+    missing_count = IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['coverage', 'missing_count']
+
+
+class PantryQuerySerializer(Serializer):
+    ingredients = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        error_messages={'empty': 'Выберите ингредиенты.'})
+    max_missing = IntegerField(min_value=0, required=False)
+    min_coverage = FloatField(min_value=0, max_value=1, default=0)
+
+
+class CartEntrySerializer(Serializer):
+    multiplier = IntegerField(min_value=1, max_value=100, required=False)
+    servings = IntegerField(min_value=1, max_value=1000, required=False)
+
+    def validate(self, data):
+        if self.context.get('required') and not data:
+            raise ValidationError('Укажите multiplier или servings.')
+        return data
+
+    def multiplier_for(self, recipe):
+        if 'servings' in self.validated_data:
+            return -(-self.validated_data['servings'] // recipe.servings)
+        return self.validated_data.get('multiplier', 1)
+
+
+class BulkRelationSerializer(Serializer):
+    action = ChoiceField(choices=['add', 'remove', 'replace'])
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        max_length=settings.BULK_RELATIONS_MAX_ITEMS)
+
+    def validate(self, data):
+        if not data['recipes'] and data['action'] != 'replace':
+            raise ValidationError({'recipes': 'Выберите рецепты.'})
+        data['recipes'] = list(dict.fromkeys(data['recipes']))
+        return data
 
 
 class CreateRecipeSerializer(ModelSerializer):
@@ -132,12 +272,13 @@ class CreateRecipeSerializer(ModelSerializer):
     tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
     ingredients = CreateRecipeIngredientSerializer(many=True)
     cooking_time = IntegerField()
-    image = Base64ImageField(use_url=True)
+    image = RecipeImageField(use_url=True)
 
     class Meta:
         model = Recipe
         fields = ['id', 'image', 'tags', 'author',
-                  'ingredients', 'name', 'text', 'cooking_time']
+                  'ingredients', 'name', 'text', 'cooking_time',
+                  'servings']
 
     def validate_tags(self, value):
         if not value:
@@ -160,6 +301,11 @@ class CreateRecipeSerializer(ModelSerializer):
         values_id = [i['id'] for i in value]
         if len(values_id) != len(set(values_id)):
             raise ValidationError({'Ингредиенты повторяются.'})
+        found = Ingredient.objects.in_bulk(values_id)
+        missing = [str(pk) for pk in values_id if pk not in found]
+        if missing:
+            raise ValidationError(
+                f'Ингредиенты не найдены: {", ".join(missing)}.')
         return value
 
     @atomic
@@ -170,6 +316,7 @@ class CreateRecipeSerializer(ModelSerializer):
                 ingredient_id=row.get('id'),
                 amount=row.get('amount'),
             ) for row in ingredients])
+        recipe_changed(recipe.id, [row.get('id') for row in ingredients])
 
     @atomic
     def create(self, validated_data):
@@ -180,14 +327,54 @@ class CreateRecipeSerializer(ModelSerializer):
                                        **validated_data)
         self.create_ingredients(recipe, ingredients)
         recipe.tags.set(tags)
+        RecipeSnapshotSerializer.store([recipe])
+        enqueue(recipe)
         return recipe
 
+    @atomic
+    def update_ingredients(self, recipe, ingredients):
+        current = {row.ingredient_id: row
+                   for row in IngredientRecipe.objects.filter(recipe=recipe)}
+        amounts = {row['id']: int(row['amount']) for row in ingredients}
+        delta = {pk: amounts.get(pk, 0)
+                 - (current[pk].amount if pk in current else 0)
+                 for pk in amounts.keys() | current.keys()}
+        created = [IngredientRecipe(recipe=recipe, ingredient_id=pk,
+                                    amount=amount)
+                   for pk, amount in amounts.items() if pk not in current]
+        changed = []
+        for pk, row in current.items():
+            if pk in amounts and row.amount != amounts[pk]:
+                row.amount = amounts[pk]
+                changed.append(row)
+        removed = [pk for pk in current if pk not in amounts]
+        IngredientRecipe.objects.bulk_create(created)
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+            ingredient_rows_applied([recipe.id])
+        if created or removed:
+            recipe_changed(recipe.id, amounts)
+        return {pk: value for pk, value in delta.items() if value}
+
     @atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        IngredientRecipe.objects.filter(recipe=instance).delete()
-        self.create_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        delta = {}
+        if 'ingredients' in validated_data:
+            delta = self.update_ingredients(
+                instance, validated_data.pop('ingredients'))
+        if delta:
+            ShoppingCartIngredient.objects.apply_amounts(
+                dict(ShoppingCart.objects.filter(
+                    recipe=instance).values_list('user_id', 'multiplier')),
+                Ingredient.objects.base_amounts(delta))
+        instance.snapshot = {}
+        recipe = super().update(instance, validated_data)
+        RecipeSnapshotSerializer.store([recipe])
+        if 'image' in validated_data:
+            enqueue(recipe)
+        return recipe
 
     def to_representation(self, instance):
         return RecipeSerializer(
@@ -198,8 +385,7 @@ class CreateRecipeSerializer(ModelSerializer):
 
 class FollowSerializer(ModelSerializer):
     recipes = SerializerMethodField()
-    recipes_count = IntegerField(source='recipes.count',
-                                 read_only=True)
+    recipes_count = SerializerMethodField(read_only=True)
     is_subscribed = SerializerMethodField(read_only=True)
 
     class Meta:
@@ -211,18 +397,25 @@ class FollowSerializer(ModelSerializer):
         read_only_fields = ['email', 'username']
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Follow.objects.filter(user=user,
-                                      author=obj).exists())
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return UserRelations.for_request(
+            self.context.get('request')).contains('following', obj.id)
+
+    def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'short_recipes'):
+            recipes = obj.short_recipes
+        else:
+            request = self.context.get('request')
+            limit = request.query_params.get('recipes_limit')
+            recipes = obj.recipes.all()
+            if limit:
+                recipes = recipes[:int(limit)]
         serializer = ShortRecipeSerializer(recipes,
                                            many=True,
                                            read_only=True)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+from .authentication import invalidate_tokens
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token(instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, created, update_fields, **kwargs):
+    if not created and set(update_fields or ()) != {'last_login'}:
+        invalidate_tokens(Token.objects.filter(
+            user=instance).values_list('key', flat=True))
@@ -1,32 +1,86 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from collections import defaultdict
+from hashlib import md5
+
+from django.db.models import BooleanField, Count, F, Value
+from django.db.transaction import atomic
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Tag)
+from recipes.autocomplete import ingredient_index
+from recipes.cache import (RECIPE_CONTENT, RECIPE_LISTS, recipe_version_name,
+                           recipes_changed)
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingCartIngredient, Tag, rebuilding_carts)
+from recipes.pantry import pantry_index
 from users.models import Follow, User
 
-from .filters import IngredientsSearchFilter, RecipeFilter
-from .pagination import CustomPagination
+from .exports import EXPORT_FORMATS
+from .filters import (CURSOR_ORDERINGS, RECIPE_ORDERINGS,
+                      IngredientsSearchFilter, RecipeFilter)
+from .mixins import AnonymousCacheMixin, ReferenceCacheMixin
+from .pagination import CustomPagination, FeedPagination
 from .permissions import IsAdminOrReadOnly
-from .serializers import (CreateRecipeSerializer, FollowSerializer,
-                          IngredientSerializer, RecipeSerializer,
+from .relations import UserRelations
+from .serializers import (BulkRelationSerializer, CartEntrySerializer,
+                          CreateRecipeSerializer, FollowSerializer,
+                          IngredientSerializer, PantryQuerySerializer,
+                          PantryRecipeSerializer, RecipeSerializer,
                           ShortRecipeSerializer, TagSerializer,
                           UsersSerializer)
 
+EXPORT_CHUNK_SIZE = 500
+
+RELATION_KINDS = {Favorite: 'favorites', ShoppingCart: 'shopping_cart'}
+RELATION_COUNTERS = {Favorite: 'favorites_count',
+                     ShoppingCart: 'shopping_cart_count'}
+
+
+def shopping_cart_etag(request):
+    file_format = request.GET.get('file_format', 'txt')
+    if (not request.user.is_authenticated
+            or file_format not in EXPORT_FORMATS):
+        return None
+    rows = ShoppingCartIngredient.objects.filter(
+        user=request.user).values_list(
+        'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'total_amount').order_by(
+        'ingredient_id')
+    return f'{file_format}-{md5(repr(list(rows)).encode()).hexdigest()}'
+
+
+def lock_relations(user):
+    User.objects.select_for_update().filter(id=user.id).values_list(
+        'id', flat=True).get()
+
+
+def bulk_status(pk, found, current, added, removed):
+    if pk in removed:
+        return 'removed'
+    if pk not in found:
+        return 'not_found'
+    if pk in current:
+        return 'exists'
+    return 'added' if pk in added else 'absent'
+
 
 class UsersViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UsersSerializer
     pagination_class = CustomPagination
+    cursor_ordering = ['username']
     permission_classes = [IsAuthenticated]
+    query_budgets = {'list': 4, 'retrieve': 3, 'me': 2,
+                     'subscriptions': 4, 'subscribe': 7}
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
@@ -43,94 +97,296 @@ class UsersViewSet(UserViewSet):
                 context={'request': request})
             serializer.is_valid(raise_exception=True)
             Follow.objects.create(user=request.user, author=author)
+            UserRelations.for_request(request).changed(
+                'following', author.id, added=True)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         subscription = get_object_or_404(Follow,
                                          user=request.user,
                                          author=author)
         self.perform_destroy(subscription)
+        UserRelations.for_request(request).changed(
+            'following', author.id, added=False)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False,
             methods=['get'],
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        queryset = User.objects.filter(
+            following__user=request.user).annotate(
+            recipes_count=Count('recipes'),
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('username')
         subscriptions = self.paginate_queryset(queryset)
+        limit = request.query_params.get('recipes_limit')
+        recipes = defaultdict(list)
+        for recipe in Recipe.objects.top_by_author(
+                subscriptions, int(limit) if limit else None):
+            recipes[recipe.author_id].append(recipe)
+        for author in subscriptions:
+            author.short_recipes = recipes[author.id]
         serializer = FollowSerializer(subscriptions,
                                       many=True,
                                       context={'request': request})
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
+    cache_name = 'ingredients'
+    query_budgets = {'list': 2, 'retrieve': 2}
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientsSearchFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(name))
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
+    cache_name = 'tags'
+    query_budgets = {'list': 2, 'retrieve': 2}
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousCacheMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [IsAdminOrReadOnly, IsAuthenticatedOrReadOnly]
     pagination_class = CustomPagination
+    query_budgets = {'list': 8, 'retrieve': 6, 'create': 22,
+                     'update': 35, 'partial_update': 30, 'destroy': 20,
+                     'favorite': 7, 'shopping_cart': 13,
+                     'download_shopping_cart': 3, 'pantry': 6, 'feed': 6,
+                     'favorite_bulk': 10, 'shopping_cart_bulk': 16}
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    response_cache_params = ('page', 'limit', 'tags', 'author')
+
+    @property
+    def cursor_ordering(self):
+        ordering = self.request.query_params.get('ordering', 'new')
+        if ordering not in CURSOR_ORDERINGS:
+            raise ValidationError({'cursor': (
+                f'Курсорная пагинация доступна только для ordering: '
+                f'{", ".join(CURSOR_ORDERINGS)}.')})
+        return RECIPE_ORDERINGS[ordering]
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.with_details(self.request.user)
+        return Recipe.objects.all()
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
         return CreateRecipeSerializer
 
+    def list(self, request, *args, **kwargs):
+        compute = super().list
+        if not self.response_cacheable(request):
+            return compute(request, *args, **kwargs)
+        return self.cached_response(
+            request, [RECIPE_CONTENT, RECIPE_LISTS],
+            lambda: compute(request, *args, **kwargs),
+            lambda data: [recipe_version_name(recipe['id'])
+                          for recipe in data['results']])
+
+    def retrieve(self, request, *args, **kwargs):
+        compute = super().retrieve
+        pk = kwargs['pk']
+        if not (self.response_cacheable(request) and pk.isdigit()):
+            return compute(request, *args, **kwargs)
+        return self.cached_response(
+            request, [RECIPE_CONTENT, recipe_version_name(int(pk))],
+            lambda: compute(request, *args, **kwargs))
+
+    def relation_fields(self, model, request, recipe):
+        if model is not ShoppingCart:
+            return {}
+        serializer = CartEntrySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return {'multiplier': serializer.multiplier_for(recipe)}
+
+    @atomic
     def add_method(self, model, request, pk):
+        lock_relations(request.user)
         if model.objects.filter(user=request.user, recipe__id=pk).exists():
             return Response(
                 {'Уже существует.'},
                 status=status.HTTP_400_BAD_REQUEST)
         recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=request.user, recipe=recipe)
+        fields = self.relation_fields(model, request, recipe)
+        model.objects.create(user=request.user, recipe=recipe, **fields)
+        Recipe.objects.filter(id=recipe.id).bump_counter(
+            RELATION_COUNTERS[model])
+        recipes_changed([recipe.id])
+        UserRelations.for_request(request).changed(
+            RELATION_KINDS[model], recipe.id, added=True)
         serializer = ShortRecipeSerializer(recipe)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({**serializer.data, **fields},
+                        status=status.HTTP_201_CREATED)
 
+    @atomic
     def delete_method(self, model, request, pk):
-        objects = model.objects.filter(user=request.user,
-                                       recipe__id=pk)
-        if objects.exists():
-            objects.delete()
+        deleted, _ = model.objects.filter(user=request.user,
+                                          recipe__id=pk).delete()
+        if deleted:
+            Recipe.objects.filter(id=pk).bump_counter(
+                RELATION_COUNTERS[model], -deleted)
+            recipes_changed([int(pk)])
+            UserRelations.for_request(request).changed(
+                RELATION_KINDS[model], int(pk), added=False)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'errors': 'Не найден.'},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    @atomic
+    def bulk_method(self, model, request):
+        serializer = BulkRelationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        mode = serializer.validated_data['action']
+        ids = serializer.validated_data['recipes']
+        lock_relations(request.user)
+        found = set(Recipe.objects.filter(id__in=ids).values_list(
+            'id', flat=True))
+        current = model.objects.filter(user=request.user)
+        if mode != 'replace':
+            current = current.filter(recipe_id__in=ids)
+        current = set(current.values_list('recipe_id', flat=True))
+        added = ([] if mode == 'remove' else
+                 [pk for pk in ids if pk in found and pk not in current])
+        removed = (set(current) - set(ids) if mode == 'replace' else
+                   set(current) if mode == 'remove' else set())
+        model.objects.bulk_create(
+            [model(user=request.user, recipe_id=pk) for pk in added])
+        if removed:
+            with rebuilding_carts():
+                model.objects.filter(
+                    user=request.user, recipe_id__in=removed).delete()
+        counter = RELATION_COUNTERS[model]
+        Recipe.objects.filter(id__in=added).bump_counter(counter)
+        Recipe.objects.filter(id__in=removed).bump_counter(counter, -1)
+        recipes_changed([*added, *removed])
+        relations = UserRelations.for_request(request)
+        for pk in added:
+            relations.changed(RELATION_KINDS[model], pk, added=True)
+        for pk in removed:
+            relations.changed(RELATION_KINDS[model], pk, added=False)
+        if model is ShoppingCart:
+            ShoppingCartIngredient.objects.apply_recipes(
+                {request.user.id: 1}, dict.fromkeys(added, 1))
+        results = [{'id': pk, 'status': bulk_status(
+            pk, found, current, added, removed)} for pk in ids]
+        results.extend({'id': pk, 'status': 'removed'}
+                       for pk in sorted(removed) if pk not in ids)
+        return Response({'added': len(added), 'removed': len(removed),
+                         'results': results})
+
+    @action(detail=False,
+            methods=['post'],
+            url_path='shopping_cart/bulk',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        return self.bulk_method(ShoppingCart, request)
+
+    @action(detail=False,
+            methods=['post'],
+            url_path='favorite/bulk',
+            permission_classes=[IsAuthenticated])
+    def favorite_bulk(self, request):
+        return self.bulk_method(Favorite, request)
+
+    @atomic
+    def update_multiplier(self, request, pk):
+        cart = get_object_or_404(
+            ShoppingCart.objects.select_for_update().select_related(
+                'recipe'),
+            user=request.user, recipe_id=pk)
+        serializer = CartEntrySerializer(
+            data=request.data, context={'required': True})
+        serializer.is_valid(raise_exception=True)
+        multiplier = serializer.multiplier_for(cart.recipe)
+        cart.multiplier = multiplier
+        cart.save(update_fields=['multiplier'])
+        serializer = ShortRecipeSerializer(cart.recipe)
+        return Response({**serializer.data, 'multiplier': multiplier})
+
     @action(detail=True,
-            methods=['post', 'delete'],
+            methods=['post', 'patch', 'delete'],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
             return self.add_method(ShoppingCart, request, pk)
+        if request.method == 'PATCH':
+            return self.update_multiplier(request, pk)
         return self.delete_method(ShoppingCart, request, pk)
 
     @action(detail=False,
             permission_classes=[IsAuthenticated])
+    @method_decorator(condition(etag_func=shopping_cart_etag))
     def download_shopping_cart(self, request):
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user).values(
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'errors': f'Доступные форматы: {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        render, content_type = EXPORT_FORMATS[file_format]
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user).values(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount_sum=Sum('amount'))
-        shop_list = '\n'.join([
-            f'* {row["ingredient__name"]} '
-            f'({row["ingredient__measurement_unit"]})'
-            f' - {row["amount_sum"]}'
-            for row in ingredients])
-        return HttpResponse(shop_list, content_type='text/plain')
+            'ingredient__measurement_unit',
+            amount_sum=F('total_amount')).order_by('ingredient__name')
+        response = StreamingHttpResponse(
+            render(ingredients.iterator(chunk_size=EXPORT_CHUNK_SIZE)),
+            content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{file_format}"')
+        return response
+
+    @action(detail=False,
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            author__in=Follow.objects.filter(
+                user=request.user).values('author'))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def pantry(self, request):
+        serializer = PantryQuerySerializer(data={
+            'ingredients': [
+                value for param in request.query_params.getlist(
+                    'ingredients') for value in param.split(',') if value],
+            **{key: request.query_params[key]
+               for key in ('max_missing', 'min_coverage')
+               if key in request.query_params}})
+        serializer.is_valid(raise_exception=True)
+        ranked = self.paginate_queryset(
+            pantry_index.rank(**serializer.validated_data))
+        recipes = self.get_queryset().in_bulk(
+            [recipe for recipe, coverage, missing in ranked])
+        page = []
+        for recipe_id, coverage, missing in ranked:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = round(coverage, 4)
+            recipe.missing_count = missing
+            page.append(recipe)
+        serializer = PantryRecipeSerializer(
+            page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True,
             methods=['post', 'delete'],
@@ -0,0 +1,116 @@
+from threading import Condition, Lock
+from time import monotonic, perf_counter
+
+from django.db.utils import OperationalError
+
+from api.metrics import registry
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+
+    def __init__(self, max_size, timeout, max_age):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.condition = Condition()
+        self.idle = []
+        self.created = {}
+        self.opening = 0
+
+    @property
+    def size(self):
+        return len(self.created) + self.opening
+
+    def expired(self, connection):
+        return (connection.closed or self.max_age is not None
+                and monotonic() - self.created[connection] > self.max_age)
+
+    def discard(self, connection):
+        self.created.pop(connection, None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def take_idle(self, check):
+        while self.idle:
+            connection = self.idle.pop()
+            if not self.expired(connection) and (
+                    check is None or check(connection)):
+                return connection
+            self.discard(connection)
+        return None
+
+    def acquire(self, connect, check=None):
+        started = perf_counter()
+        deadline = monotonic() + self.timeout
+        with self.condition:
+            while True:
+                connection = self.take_idle(check)
+                if connection is not None:
+                    registry.connection_acquired(
+                        'pool', perf_counter() - started)
+                    return connection
+                if self.size < self.max_size:
+                    self.opening += 1
+                    break
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    registry.connection_timeout()
+                    raise PoolTimeout(
+                        f'Нет свободных соединений с БД за '
+                        f'{self.timeout} с (пул на {self.max_size}).')
+                self.condition.wait(remaining)
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opening -= 1
+            self.created[connection] = monotonic()
+        registry.connection_acquired('new', perf_counter() - started)
+        return connection
+
+    def release(self, connection):
+        try:
+            if not connection.closed and not connection.autocommit:
+                connection.rollback()
+            broken = False
+        except Exception:
+            broken = True
+        with self.condition:
+            if (broken or connection not in self.created
+                    or self.expired(connection)):
+                self.discard(connection)
+            else:
+                self.idle.append(connection)
+            self.condition.notify()
+
+
+pools = {}
+pools_lock = Lock()
+
+
+def get_pool(alias, options):
+    with pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(
+                options['MAX_SIZE'], options['TIMEOUT'],
+                options.get('MAX_AGE'))
+        return pools[alias]
+
+
+def close_pool(alias):
+    with pools_lock:
+        pool = pools.pop(alias, None)
+    if pool is not None:
+        with pool.condition:
+            while pool.idle:
+                pool.discard(pool.idle.pop())
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -48,7 +49,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram_backend.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', default='foodgram_backend.urls')
 
 TEMPLATES = [
     {
@@ -71,12 +72,33 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE',
-                            default='django.db.backends.postgresql'),
+                            default='foodgram_backend.db.postgresql'),
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='true').lower() == 'true',
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_DISABLE_SERVER_SIDE_CURSORS',
+            default='false').lower() == 'true',
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=0)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=5)),
+            'MAX_AGE': int(os.getenv('DB_POOL_MAX_AGE', default=300)),
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django_redis.cache.RedisCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION',
+                              default='redis://redis:6379/1'),
     }
 }
 
@@ -115,7 +137,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny'],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication']}
+        'api.authentication.CachedTokenAuthentication']}
+
+AUTH_TOKEN_CACHE = os.getenv('AUTH_TOKEN_CACHE', default='')
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=5 * 60))
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -129,3 +155,49 @@ DJOSER = {
         'user_list': ['rest_framework.permissions.AllowAny']}}
 
 PAGINATION_SIZE = 6
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(
+    os.getenv('INGREDIENT_AUTOCOMPLETE_LIMIT', default=20))
+INGREDIENT_INDEX_TIMEOUT = int(
+    os.getenv('INGREDIENT_INDEX_TIMEOUT', default=300))
+PANTRY_INDEX_TIMEOUT = int(
+    os.getenv('PANTRY_INDEX_TIMEOUT', default=300))
+
+BULK_RELATIONS_MAX_ITEMS = int(
+    os.getenv('BULK_RELATIONS_MAX_ITEMS', default=100))
+
+QUERY_BUDGET_STRICT = os.getenv(
+    'QUERY_BUDGET_STRICT', default=str(DEBUG)).lower() == 'true'
+
+USER_RELATIONS_CACHE_TIMEOUT = int(
+    os.getenv('USER_RELATIONS_CACHE_TIMEOUT', default=0))
+
+REFERENCE_CACHE_TIMEOUT = int(
+    os.getenv('REFERENCE_CACHE_TIMEOUT', default=24 * 60 * 60))
+REFERENCE_CACHE_CONTROL = {
+    'public': True,
+    'max_age': int(os.getenv('REFERENCE_CACHE_MAX_AGE', default=0)),
+    'must_revalidate': True,
+}
+
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', default=5 * 60))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_LOCK_TIMEOUT', default=10))
+RESPONSE_CACHE_LOCK_WAIT = float(
+    os.getenv('RESPONSE_CACHE_LOCK_WAIT', default=2))
+
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', default=10))
+
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.getenv('RECIPE_IMAGE_MAX_BYTES', default=10 * 1024 * 1024))
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=40_000_000))
+RECIPE_IMAGE_SIZES = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1280,
+}
+RECIPE_IMAGE_FORMATS = ['webp', 'jpeg']
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_TIMEOUT = 10 * 60
@@ -1,16 +1,21 @@
 from django.contrib import admin
-from django.contrib.admin import display
 
-from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                     ShoppingCart, Tag)
+from .models import (Favorite, ImageJob, Ingredient, IngredientRecipe, Recipe,
+                     ShoppingCart, ShoppingCartIngredient, Tag, UnitConversion)
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ['name', 'measurement_unit']
+    list_display = ['name', 'measurement_unit', 'base', 'base_factor']
+    readonly_fields = ['base', 'base_factor']
     list_filter = ['name']
 
 
+@admin.register(UnitConversion)
+class UnitConversionAdmin(admin.ModelAdmin):
+    list_display = ['unit', 'base_unit', 'factor']
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ['name', 'color', 'slug']
@@ -19,18 +24,15 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'author', 'in_favorite']
-    readonly_fields = ['in_favorite']
+    list_display = ['id', 'name', 'author', 'favorites_count',
+                    'shopping_cart_count']
+    readonly_fields = ['favorites_count', 'shopping_cart_count']
     list_filter = ['author', 'name', 'tags']
 
-    @display(description='Добавлено в избранное')
-    def in_favorite(self, obj):
-        return obj.in_favorite.count()
-
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ['user', 'recipe']
+    list_display = ['user', 'recipe', 'multiplier']
     list_filter = ['user']
 
 
@@ -44,3 +46,15 @@ class FavoriteAdmin(admin.ModelAdmin):
 class IngredientForRecipesAdmin(admin.ModelAdmin):
     list_display = ['recipe', 'ingredient', 'amount']
     list_filter = ['recipe', 'ingredient']
+
+
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(admin.ModelAdmin):
+    list_display = ['user', 'ingredient', 'total_amount']
+    list_filter = ['user']
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['recipe', 'status', 'attempts', 'updated']
+    list_filter = ['status']
@@ -0,0 +1,65 @@
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from .cache import get_version
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self.entries = ([], [])
+        self.loaded_at = None
+        self.token = None
+        self.lock = Lock()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def load(self, token):
+        from .models import Ingredient
+
+        rows = sorted(
+            ({'id': pk, 'name': name, 'measurement_unit': unit}
+             for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit').iterator()),
+            key=lambda row: (row['name'].casefold(), row['id']))
+        self.entries = ([row['name'].casefold() for row in rows], rows)
+        self.token = token
+        self.loaded_at = monotonic()
+
+    def is_fresh(self, token):
+        return (self.loaded_at is not None and self.token == token
+                and monotonic() - self.loaded_at
+                < settings.INGREDIENT_INDEX_TIMEOUT)
+
+    def ensure_loaded(self):
+        token = get_version('ingredients')['token']
+        if self.is_fresh(token):
+            return
+        with self.lock:
+            if not self.is_fresh(token):
+                self.load(token)
+
+    def search(self, query, limit=None):
+        self.ensure_loaded()
+        limit = limit or settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        keys, rows = self.entries
+        query = query.casefold()
+        found = []
+        index = bisect_left(keys, query)
+        while (index < len(keys) and len(found) < limit
+               and keys[index].startswith(query)):
+            found.append(rows[index])
+            index += 1
+        for key, row in zip(keys, rows):
+            if len(found) >= limit:
+                break
+            if query in key and not key.startswith(query):
+                found.append(row)
+        return found
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,57 @@
+from time import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+RECIPE_CONTENT = 'recipes'
+RECIPE_LISTS = 'recipe-lists'
+
+
+def version_key(name):
+    return f'reference:{name}:version'
+
+
+def recipe_version_name(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def new_version():
+    return {'token': uuid4().hex, 'modified': int(time())}
+
+
+def get_version(name):
+    return cache.get_or_set(version_key(name), new_version, None)
+
+
+def get_tokens(names):
+    found = cache.get_many([version_key(name) for name in names])
+    return {name: (found.get(version_key(name)) or get_version(name))['token']
+            for name in names}
+
+
+def bump_version(name):
+    version = new_version()
+    cache.set(version_key(name), version, None)
+    return version
+
+
+def bump_versions(names):
+    cache.set_many({version_key(name): new_version() for name in names},
+                   None)
+
+
+def get_cached(name, compute, part='data'):
+    key = f'reference:{name}:{get_version(name)["token"]}:{part}'
+    return cache.get_or_set(key, compute, settings.REFERENCE_CACHE_TIMEOUT)
+
+
+def recipes_changed(recipe_ids=(), lists=False, content=False):
+    names = [recipe_version_name(pk) for pk in recipe_ids]
+    if lists:
+        names.append(RECIPE_LISTS)
+    if content:
+        names.append(RECIPE_CONTENT)
+    if names:
+        transaction.on_commit(lambda: bump_versions(names))
@@ -0,0 +1,123 @@
+import io
+import os.path
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.db.transaction import atomic, on_commit
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .cache import recipes_changed
+from .models import ImageJob, ImageJobStatus, Recipe
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+             'progressive': True},
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def delete_variants(variants):
+    for formats in (variants or {}).values():
+        for path in formats.values():
+            default_storage.delete(path)
+
+
+def enqueue(recipe):
+    stale = recipe.image_variants
+    if stale:
+        on_commit(lambda: delete_variants(stale))
+    Recipe.objects.filter(id=recipe.id).update(image_variants={})
+    recipe.image_variants = {}
+    if recipe.image:
+        ImageJob.objects.create(recipe=recipe, image=recipe.image.name)
+
+
+def available_formats():
+    return [name for name in settings.RECIPE_IMAGE_FORMATS
+            if name != 'webp' or features.check('webp')]
+
+
+@atomic
+def claim_job():
+    stale = timezone.now() - timedelta(seconds=settings.IMAGE_JOB_TIMEOUT)
+    job = ImageJob.objects.select_for_update(skip_locked=True).filter(
+        Q(status=ImageJobStatus.PENDING)
+        | Q(status=ImageJobStatus.PROCESSING, updated__lt=stale),
+        attempts__lt=settings.IMAGE_JOB_MAX_ATTEMPTS).first()
+    if job is None:
+        return None
+    ImageJob.objects.filter(id=job.id).update(
+        status=ImageJobStatus.PROCESSING,
+        attempts=F('attempts') + 1,
+        updated=timezone.now())
+    return job
+
+
+def open_image(name, size):
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        return image.convert('RGB')
+
+
+def render_variants(job):
+    sizes = sorted(settings.RECIPE_IMAGE_SIZES.items(),
+                   key=lambda item: item[1], reverse=True)
+    image = open_image(job.image, sizes[0][1])
+    stem = os.path.splitext(os.path.basename(job.image))[0]
+    variants = {}
+    for name, size in sizes:
+        image.thumbnail((size, size))
+        variants[name] = {}
+        for image_format in available_formats():
+            buffer = io.BytesIO()
+            image.save(buffer, **SAVE_OPTIONS[image_format])
+            variants[name][image_format] = default_storage.save(
+                f'recipes/derived/{stem}_{name}.'
+                f'{EXTENSIONS[image_format]}',
+                ContentFile(buffer.getvalue()))
+    return variants
+
+
+def process_job(job):
+    try:
+        variants = render_variants(job)
+    except Exception as error:
+        ImageJob.objects.filter(id=job.id).update(
+            status=(ImageJobStatus.FAILED
+                    if job.attempts + 1 >= settings.IMAGE_JOB_MAX_ATTEMPTS
+                    else ImageJobStatus.PENDING),
+            error=repr(error))
+        return False
+    with atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            id=job.recipe_id, image=job.image).only('image_variants').first()
+        if recipe is None:
+            stale = variants
+        else:
+            stale = recipe.image_variants
+            Recipe.objects.filter(id=recipe.id).update(
+                image_variants=variants)
+            recipes_changed([job.recipe_id])
+        on_commit(lambda: delete_variants(stale))
+    ImageJob.objects.filter(id=job.id).update(
+        status=ImageJobStatus.DONE, error='')
+    return True
+
+
+def variant_urls(recipe, request=None):
+    urls = {}
+    for name, formats in (recipe.image_variants or {}).items():
+        urls[name] = {}
+        for image_format, path in formats.items():
+            url = default_storage.url(path)
+            urls[name][image_format] = (
+                request.build_absolute_uri(url) if request else url)
+    return urls
@@ -0,0 +1,140 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.db.transaction import atomic
+
+from recipes.cache import bump_version, recipes_changed
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+TAGS = [('Завтрак', '#E26C2D', 'breakfast'),
+        ('Обед', '#49B64E', 'lunch'),
+        ('Ужин', '#8775D2', 'dinner')]
+WORDS = ['суп', 'салат', 'пирог', 'рагу', 'каша', 'запеканка', 'паста',
+         'омлет', 'блины', 'котлеты', 'домашний', 'быстрый', 'острый',
+         'сырный', 'овощной', 'летний', 'бабушкин', 'постный']
+
+
+def zipf_weights(size, exponent=1.1):
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(size)))
+
+
+class Command(BaseCommand):
+    help = 'Генерирует воспроизводимый синтетический набор данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на пользователя в среднем.')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя.')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Рецептов в корзине на пользователя.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', verbosity=0)
+        started = perf_counter()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with atomic():
+            users = self.create_users(options['users'])
+            tags = self.create_tags()
+            recipes = self.create_recipes(users, tags, options['recipes'])
+            self.create_relations(users, users, Follow, 'author',
+                                  options['follows'], exclude_self=True)
+            self.create_relations(users, recipes, Favorite, 'recipe',
+                                  options['favorites'])
+            self.create_relations(users, recipes, ShoppingCart, 'recipe',
+                                  options['cart'])
+        call_command('rebuild_shopping_carts', verbosity=0)
+        call_command('rebuild_search_index', verbosity=0)
+        call_command('reconcile_counters', verbosity=0)
+        call_command('refresh_snapshots', once=True, verbosity=0)
+        bump_version('pantry')
+        recipes_changed(lists=True, content=True)
+        self.stdout.write(
+            f'Создано пользователей: {len(users)}, '
+            f'рецептов: {len(recipes)}. '
+            f'Время: {perf_counter() - started:.2f} с.')
+
+    def new_ids(self, model, previous, query):
+        return list(model.objects.filter(
+            id__gt=previous or 0, **query).values_list('id', flat=True))
+
+    def create_users(self, count):
+        previous = User.objects.aggregate(last=Max('id'))['last']
+        offset = User.objects.count()
+        password = make_password('synthetic-password')
+        User.objects.bulk_create(
+            [User(email=f'synthetic{offset + number}@example.com',
+                  username=f'synthetic{offset + number}',
+                  first_name='Synthetic', last_name=f'User{number}',
+                  password=password)
+             for number in range(count)],
+            batch_size=self.batch_size)
+        return self.new_ids(User, previous, {})
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color})
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_recipes(self, users, tags, count):
+        if not users:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        rng = self.rng
+        previous = Recipe.objects.aggregate(last=Max('id'))['last']
+        authors = zipf_weights(len(users))
+        Recipe.objects.bulk_create(
+            [Recipe(author_id=rng.choices(users, cum_weights=authors)[0],
+                    name=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                    text=' '.join(rng.choices(WORDS, k=40)),
+                    cooking_time=rng.randint(5, 180))
+             for _ in range(count)],
+            batch_size=self.batch_size)
+        recipes = self.new_ids(Recipe, previous, {'author_id__in': users})
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        weights = zipf_weights(len(ingredients))
+        rows = []
+        tag_rows = []
+        for recipe in recipes:
+            chosen = set(rng.choices(ingredients, cum_weights=weights,
+                                     k=rng.randint(3, 12)))
+            rows.extend(IngredientRecipe(recipe_id=recipe,
+                                         ingredient_id=ingredient,
+                                         amount=rng.randint(1, 500))
+                        for ingredient in chosen)
+            tag_rows.extend(Recipe.tags.through(recipe_id=recipe,
+                                                tag_id=tag)
+                            for tag in rng.sample(tags, rng.randint(1, 2)))
+        IngredientRecipe.objects.bulk_create(
+            rows, batch_size=self.batch_size)
+        Recipe.tags.through.objects.bulk_create(
+            tag_rows, batch_size=self.batch_size)
+        return recipes
+
+    def create_relations(self, users, targets, model, field, average,
+                         exclude_self=False):
+        rng = self.rng
+        weights = zipf_weights(len(targets))
+        rows = []
+        for user in users:
+            count = min(rng.randint(0, 2 * average), len(targets))
+            chosen = set(rng.choices(targets, cum_weights=weights, k=count))
+            chosen.discard(user if exclude_self else None)
+            rows.extend(model(user_id=user, **{f'{field}_id': target})
+                        for target in chosen)
+        model.objects.bulk_create(
+            rows, batch_size=self.batch_size, ignore_conflicts=True)
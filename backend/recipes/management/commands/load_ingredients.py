@@ -1,25 +1,119 @@
 ﻿import csv
+import json
 import os.path
+from itertools import islice
+from time import perf_counter
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic, on_commit
 
 from recipes.models import Ingredient
+from recipes.signals import ingredients_changed, units_changed
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON оборвался.')
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file', nargs='?', default='ingredients.csv',
+            help='Путь к файлу или имя файла в папке data.')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла; по умолчанию берётся из расширения.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки для bulk_create.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Показать, что будет добавлено, без записи в базу.')
 
     def handle(self, *args, **options):
-        self.import_ingredients('ingredients.csv')
-        print('Загрузка завершена.')
-
-    def import_ingredients(self, file):
-        file_path = os.path.join(DATA_ROOT, file)
-        with open(file_path, newline='', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                status, created = Ingredient.objects.update_or_create(
-                    name=row[0],
-                    measurement_unit=row[1])
+        self.verbosity = options['verbosity']
+        file_path = options['file']
+        if not os.path.exists(file_path):
+            file_path = os.path.join(DATA_ROOT, file_path)
+        file_format = (options['format']
+                       or os.path.splitext(file_path)[1].lstrip('.'))
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат: {file_format}.')
+        started = perf_counter()
+        existing = set(Ingredient.objects.values_list(
+            'name', 'measurement_unit').iterator())
+        with open(file_path, newline='', encoding='utf-8-sig') as file:
+            created, skipped = self.import_ingredients(
+                READERS[file_format](file), existing,
+                options['batch_size'], options['dry_run'])
+        elapsed = perf_counter() - started
+        action = 'Будет добавлено' if options['dry_run'] else 'Добавлено'
+        self.stdout.write(
+            f'{action}: {created}, уже есть или повторяются: {skipped}. '
+            f'Время: {elapsed:.2f} с.')
+        self.stdout.write('Загрузка завершена.')
+
+    @atomic
+    def import_ingredients(self, rows, existing, batch_size, dry_run):
+        created = skipped = 0
+        for chunk in chunks(rows, batch_size):
+            batch = []
+            for name, measurement_unit in chunk:
+                key = (name.strip(), measurement_unit.strip())
+                if key in existing:
+                    skipped += 1
+                    continue
+                existing.add(key)
+                batch.append(Ingredient(
+                    name=key[0], measurement_unit=key[1]))
+                if dry_run and self.verbosity > 1:
+                    self.stdout.write(f'+ {key[0]}, {key[1]}')
+            created += len(batch)
+            if not dry_run:
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        if created and not dry_run:
+            on_commit(ingredients_changed)
+            on_commit(units_changed)
+        return created, skipped
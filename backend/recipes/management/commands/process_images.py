@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from recipes.images import claim_job, process_job
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает очередь изображений рецептов: миниатюры, '
+            'карточки и полноразмерные версии в WebP/JPEG.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = [pool.submit(self.work, options['once'],
+                                   options['poll_interval'])
+                       for _ in range(options['workers'])]
+        processed = sum(result.result() for result in results)
+        self.stdout.write(f'Обработано изображений: {processed}.')
+
+    def work(self, once, poll_interval):
+        processed = 0
+        try:
+            while True:
+                close_old_connections()
+                job = claim_job()
+                if job is None:
+                    if once:
+                        return processed
+                    sleep(poll_interval)
+                    continue
+                if process_job(job):
+                    processed += 1
+        finally:
+            connection.close()
@@ -0,0 +1,50 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.db.transaction import atomic
+
+from recipes.models import Recipe
+from recipes.search import search_recipes, update_search_index
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает полнотекстовый индекс рецептов '
+            '(название, описание, ингредиенты).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benchmark', nargs='*', metavar='QUERY',
+            help='Сравнить время поиска по индексу и через ILIKE.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['benchmark'] is not None:
+            return self.benchmark(options['benchmark'] or ['суп'],
+                                  options['repeat'])
+        started = perf_counter()
+        with atomic():
+            update_search_index()
+        self.stdout.write(
+            f'Индекс перестроен за {perf_counter() - started:.2f} с.')
+        return None
+
+    def benchmark(self, queries, repeat):
+        paths = {
+            'index': lambda query: search_recipes(
+                Recipe.objects.all(), query),
+            'ilike': lambda query: Recipe.objects.filter(
+                Q(name__icontains=query) | Q(text__icontains=query)
+                | Q(ingredients__name__icontains=query)).distinct(
+            ).order_by('-pub_date'),
+        }
+        for query in queries:
+            for name, search in paths.items():
+                started = perf_counter()
+                for _ in range(repeat):
+                    found = list(search(query).values_list(
+                        'id', flat=True)[:20])
+                elapsed = perf_counter() - started
+                self.stdout.write(
+                    f'{query!r} {name}: {len(found)} рецептов, '
+                    f'{elapsed / repeat * 1000:.3f} мс на запрос')
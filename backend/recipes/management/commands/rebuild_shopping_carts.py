@@ -0,0 +1,67 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingCartIngredient
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает агрегированные списки покупок '
+            '(ShoppingCartIngredient) из корзин пользователей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить агрегат с корзинами, ничего не меняя.')
+        parser.add_argument(
+            '--benchmark', action='store_true',
+            help='Сравнить время выгрузки списка через JOIN и через агрегат.')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark()
+        drift = self.find_drift()
+        self.stdout.write(f'Расхождений: {len(drift)}.')
+        if options['verify'] or not drift:
+            return None
+        self.rebuild()
+        self.stdout.write('Агрегат пересчитан.')
+        return None
+
+    def find_drift(self):
+        expected = {(user, ingredient): total
+                    for user, ingredient, total
+                    in ShoppingCartIngredient.objects.expected().iterator()}
+        drift = []
+        for user, ingredient, total in (
+                ShoppingCartIngredient.objects.values_list(
+                    'user', 'ingredient', 'total_amount').iterator()):
+            if expected.pop((user, ingredient), None) != total:
+                drift.append((user, ingredient))
+        drift.extend(expected)
+        return drift
+
+    def rebuild(self):
+        ShoppingCartIngredient.objects.rebuild(batch_size=BATCH_SIZE)
+
+    def benchmark(self):
+        users = list(ShoppingCartIngredient.objects.values_list(
+            'user', flat=True).distinct())
+        paths = {
+            'join': lambda user: ShoppingCartIngredient.objects.expected(
+                [user]),
+            'aggregate': lambda user: ShoppingCartIngredient.objects.filter(
+                user=user).values(
+                'ingredient__name', 'ingredient__measurement_unit',
+                'total_amount'),
+        }
+        for name, query in paths.items():
+            started = perf_counter()
+            for user in users:
+                list(query(user))
+            elapsed = perf_counter() - started
+            self.stdout.write(
+                f'{name}: {len(users)} корзин за {elapsed:.3f} с '
+                f'({elapsed / max(len(users), 1) * 1000:.3f} мс на корзину)')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+
+from recipes.cache import recipes_changed
+from recipes.models import Recipe
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики избранного и корзины у рецептов '
+            '(favorites_count, shopping_cart_count) и исправляет '
+            'расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только показать расхождения, ничего не меняя.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        drift = list(Recipe.objects.with_counter_drift().values_list(
+            'id', flat=True))
+        self.stdout.write(f'Рецептов с расхождениями: {len(drift)}.')
+        if options['verify'] or not drift:
+            return
+        batch_size = options['batch_size']
+        with atomic():
+            for start in range(0, len(drift), batch_size):
+                Recipe.objects.filter(
+                    id__in=drift[start:start + batch_size]).update(
+                    **Recipe.objects.actual_counters())
+            recipes_changed(content=True)
+        self.stdout.write('Счётчики исправлены.')
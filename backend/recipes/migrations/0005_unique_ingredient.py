@@ -0,0 +1,49 @@
+# Generated by Django 3.2.14 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit').annotate(
+        kept=models.Min('id'), total=models.Count('id')).filter(
+        total__gt=1).order_by()
+    for group in duplicates:
+        kept = group['kept']
+        extra = Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit']).exclude(id=kept)
+        for row in IngredientRecipe.objects.filter(ingredient__in=extra):
+            merged, created = IngredientRecipe.objects.get_or_create(
+                recipe_id=row.recipe_id, ingredient_id=kept,
+                defaults={'amount': 0})
+            merged.amount += row.amount
+            merged.save()
+        for row in ShoppingCartIngredient.objects.filter(
+                ingredient__in=extra):
+            merged, created = ShoppingCartIngredient.objects.get_or_create(
+                user_id=row.user_id, ingredient_id=kept,
+                defaults={'total_amount': 0})
+            merged.total_amount += row.total_amount
+            merged.save()
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
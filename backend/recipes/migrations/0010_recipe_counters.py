@@ -0,0 +1,42 @@
+# Generated by Django 3.2.14 on 2026-10-18 17:25
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    counts = {}
+    for field, name in [('favorites_count', 'Favorite'),
+                        ('shopping_cart_count', 'ShoppingCart')]:
+        model = apps.get_model('recipes', name)
+        counts[field] = Coalesce(models.Subquery(model.objects.filter(
+            recipe=models.OuterRef('pk')).order_by().values(
+            'recipe').annotate(count=models.Count('id')).values(
+            'count')), 0)
+    Recipe.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Favorites count'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Shopping cart count'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-pub_date', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 3.2.14 on 2026-10-18 17:32
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+CONVERSIONS = [
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+    ('стакан', 'мл', 250),
+    ('ст. л.', 'мл', 15),
+    ('ч. л.', 'мл', 5),
+]
+AMOUNT_FIELD = models.DecimalField(max_digits=14, decimal_places=3)
+
+
+def link_units(apps, schema_editor):
+    UnitConversion = apps.get_model('recipes', 'UnitConversion')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient')
+    UnitConversion.objects.bulk_create(
+        [UnitConversion(unit=unit, base_unit=base_unit, factor=factor)
+         for unit, base_unit, factor in CONVERSIONS],
+        ignore_conflicts=True)
+    conversions = UnitConversion.objects.filter(
+        unit=models.OuterRef('measurement_unit'))
+    Ingredient.objects.update(
+        base=models.Subquery(Ingredient.objects.filter(
+            name=models.OuterRef('name'),
+            measurement_unit=models.Subquery(UnitConversion.objects.filter(
+                unit=models.OuterRef(models.OuterRef('measurement_unit'))
+            ).values('base_unit')[:1])).exclude(
+            id=models.OuterRef('id')).values('id')[:1]),
+        base_factor=Coalesce(
+            models.Subquery(conversions.values('factor')[:1]),
+            1, output_field=AMOUNT_FIELD))
+    Ingredient.objects.filter(base__isnull=True).update(base_factor=1)
+    totals = IngredientRecipe.objects.filter(
+        recipe__shopping_cart__isnull=False).values_list(
+        'recipe__shopping_cart__user',
+        Coalesce('ingredient__base', 'ingredient')).annotate(
+        total=models.Sum(models.ExpressionWrapper(
+            models.F('amount') * models.F('ingredient__base_factor'),
+            output_field=AMOUNT_FIELD))).order_by()
+    ShoppingCartIngredient.objects.all().delete()
+    ShoppingCartIngredient.objects.bulk_create(
+        [ShoppingCartIngredient(user_id=user, ingredient_id=ingredient,
+                                total_amount=total)
+         for user, ingredient, total in totals.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_author_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(max_length=10, unique=True, verbose_name='Unit')),
+                ('base_unit', models.CharField(max_length=10, verbose_name='Base unit')),
+                ('factor', models.DecimalField(decimal_places=4, max_digits=12, validators=[django.core.validators.MinValueValidator(0, 'Минимальное значение - 0.')], verbose_name='Factor')),
+            ],
+            options={
+                'verbose_name': 'UnitConversion',
+                'verbose_name_plural': 'UnitConversions',
+                'ordering': ['unit'],
+            },
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='variants', to='recipes.ingredient', verbose_name='Base ingredient'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='base_factor',
+            field=models.DecimalField(decimal_places=4, default=1, max_digits=12, verbose_name='Base unit factor'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, 'Минимальное значение - 1.')], verbose_name='Servings'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='multiplier',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, 'Минимальное значение - 1.')], verbose_name='Multiplier'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcartingredient',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=3, max_digits=14, verbose_name='Total amount'),
+        ),
+        migrations.RunPython(link_units, migrations.RunPython.noop),
+    ]
@@ -1,24 +1,119 @@
+from contextlib import contextmanager
+
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import models, transaction
+from django.db.models import (BooleanField, Case, Count, DecimalField, Exists,
+                              ExpressionWrapper, F, OuterRef, Prefetch, Q,
+                              Subquery, Sum, UniqueConstraint, Value, When,
+                              Window)
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+
+from users.models import Follow
 
 User = get_user_model()
 
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=3)
+
+
+@contextmanager
+def rebuilding_carts():
+    connection = transaction.get_connection()
+    depth = getattr(connection, 'rebuilding_carts', 0)
+    connection.rebuilding_carts = depth + 1
+    try:
+        yield
+    finally:
+        connection.rebuilding_carts = depth
+
+
+def carts_rebuilding():
+    return bool(getattr(transaction.get_connection(), 'rebuilding_carts', 0))
+
+
+class UnitConversion(models.Model):
+    unit = models.CharField(
+        max_length=10,
+        unique=True,
+        verbose_name='Unit')
+    base_unit = models.CharField(
+        max_length=10,
+        verbose_name='Base unit')
+    factor = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        verbose_name='Factor',
+        validators=[MinValueValidator(0, 'Минимальное значение - 0.')])
+
+    class Meta:
+        verbose_name = 'UnitConversion'
+        verbose_name_plural = 'UnitConversions'
+        ordering = ['unit']
+
+    def __str__(self):
+        return f'1 {self.unit} = {self.factor} {self.base_unit}'
+
+
+class IngredientQuerySet(models.QuerySet):
+
+    def link_units(self):
+        before = set(self.values_list('id', 'base_id', 'base_factor'))
+        conversions = UnitConversion.objects.filter(
+            unit=OuterRef('measurement_unit'))
+        self.update(
+            base=Subquery(Ingredient.objects.filter(
+                name=OuterRef('name'),
+                measurement_unit=Subquery(UnitConversion.objects.filter(
+                    unit=OuterRef(OuterRef('measurement_unit'))).values(
+                    'base_unit')[:1])).exclude(
+                id=OuterRef('id')).values('id')[:1]),
+            base_factor=Coalesce(Subquery(conversions.values('factor')[:1]),
+                                 1, output_field=AMOUNT_FIELD))
+        self.filter(base__isnull=True).update(base_factor=1)
+        after = set(self.values_list('id', 'base_id', 'base_factor'))
+        return {row[0] for row in before ^ after}
+
+    def base_amounts(self, amounts):
+        result = {}
+        for pk, base, factor in self.filter(id__in=amounts).values_list(
+                'id', 'base_id', 'base_factor'):
+            key = base or pk
+            result[key] = result.get(key, 0) + amounts[pk] * factor
+        return result
+
 
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=200,
+        db_index=True,
         verbose_name='Name')
     measurement_unit = models.CharField(
         max_length=10,
         verbose_name='Measurement_unit')
+    base = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='variants',
+        verbose_name='Base ingredient')
+    base_factor = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=1,
+        verbose_name='Base unit factor')
+
+    objects = IngredientQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
         ordering = ['name']
+        constraints = [
+            UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient')]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -48,6 +143,76 @@ class Tag(models.Model):
         return self.name
 
 
+def related_count(model):
+    return Coalesce(Subquery(model.objects.filter(
+        recipe=OuterRef('pk')).order_by().values('recipe').annotate(
+        count=Count('id')).values('count')), 0)
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def delete(self):
+        with rebuilding_carts():
+            return super().delete()
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()))
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
+
+    def with_details(self, user):
+        if user.is_authenticated:
+            subscribed = Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author')))
+        else:
+            subscribed = Value(False, output_field=BooleanField())
+        return self.with_user_flags(user).annotate(
+            author_is_subscribed=subscribed)
+
+    def expire_snapshots(self):
+        return self.update(snapshot={})
+
+    def with_stale_snapshots(self, version):
+        return self.filter(Q(snapshot__version__isnull=True)
+                           | ~Q(snapshot__version=version))
+
+    def bump_counter(self, field, delta=1):
+        return self.update(**{field: Greatest(F(field) + delta, 0)})
+
+    def actual_counters(self):
+        return {'favorites_count': related_count(Favorite),
+                'shopping_cart_count': related_count(ShoppingCart)}
+
+    def with_counter_drift(self):
+        return self.annotate(
+            actual_favorites_count=related_count(Favorite),
+            actual_shopping_cart_count=related_count(ShoppingCart)
+        ).exclude(favorites_count=F('actual_favorites_count'),
+                  shopping_cart_count=F('actual_shopping_cart_count'))
+
+    def top_by_author(self, authors, limit=None):
+        if not authors:
+            return self.none()
+        queryset = self.filter(author__in=authors)
+        if limit is None:
+            return queryset
+        ranked = queryset.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]))
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            f'ORDER BY author_id, row_number',
+            [*params, limit])
+
+
 class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Publication date',
@@ -74,20 +239,55 @@ class Recipe(models.Model):
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Cooking time',
         validators=[MinValueValidator(1, 'Минимальное значение - 1.')])
+    servings = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Servings',
+        validators=[MinValueValidator(1, 'Минимальное значение - 1.')])
     image = models.ImageField(
         null=True,
         upload_to='recipes/images/',
         verbose_name='Image',
         default=None)
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Image variants')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Favorites count')
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Shopping cart count')
+    snapshot = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Snapshot')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_popular_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx')]
 
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        with rebuilding_carts():
+            return super().delete(*args, **kwargs)
+
 
 class IngredientRecipe(models.Model):
     recipe = models.ForeignKey(
@@ -150,6 +350,10 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name='shopping_cart',
         verbose_name='Recipe')
+    multiplier = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Multiplier',
+        validators=[MinValueValidator(1, 'Минимальное значение - 1.')])
 
     class Meta:
         verbose_name = 'ShoppingCart'
@@ -161,3 +365,165 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe} - добавлено.'
+
+
+def snapshot_relations():
+    return ['tags', 'author', Prefetch(
+        'ingridients_recipe',
+        queryset=IngredientRecipe.objects.select_related('ingredient'))]
+
+
+def base_amount(prefix=''):
+    return ExpressionWrapper(
+        F(f'{prefix}amount') * F(f'{prefix}ingredient__base_factor'),
+        output_field=AMOUNT_FIELD)
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+
+    def apply_amounts(self, users, amounts):
+        amounts = {key: value for key, value in amounts.items() if value}
+        users = {key: value for key, value in users.items() if value}
+        if not amounts or not users:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [self.model(user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            total_amount=0)
+                 for user_id, multiplier in users.items()
+                 for ingredient_id, amount in amounts.items()
+                 if amount * multiplier > 0],
+                ignore_conflicts=True)
+            rows = self.filter(user_id__in=users, ingredient_id__in=amounts)
+            rows.update(total_amount=ExpressionWrapper(
+                F('total_amount') + Case(
+                    *[When(ingredient_id=pk, then=Value(amount))
+                      for pk, amount in amounts.items()],
+                    output_field=AMOUNT_FIELD) * Case(
+                    *[When(user_id=pk, then=Value(multiplier))
+                      for pk, multiplier in users.items()],
+                    output_field=AMOUNT_FIELD),
+                output_field=AMOUNT_FIELD))
+            rows.filter(total_amount__lte=0).delete()
+
+    def apply_recipe(self, users, recipe_id, sign=1):
+        self.apply_recipes(users, {int(recipe_id): sign})
+
+    def apply_recipes(self, users, recipes):
+        amounts = {}
+        for recipe, ingredient, amount in IngredientRecipe.objects.filter(
+                recipe_id__in=recipes).values_list(
+                'recipe_id', Coalesce('ingredient__base', 'ingredient')
+        ).annotate(amount=Sum(base_amount())).order_by():
+            amounts[ingredient] = (amounts.get(ingredient, 0)
+                                   + recipes[recipe] * amount)
+        self.apply_amounts(users, amounts)
+
+    def expected(self, user_ids=None):
+        carts = {'recipe__shopping_cart__isnull': False}
+        if user_ids is not None:
+            carts['recipe__shopping_cart__user__in'] = user_ids
+        return IngredientRecipe.objects.filter(**carts).values_list(
+            'recipe__shopping_cart__user',
+            Coalesce('ingredient__base', 'ingredient')).annotate(
+            total=Sum(ExpressionWrapper(
+                base_amount() * F('recipe__shopping_cart__multiplier'),
+                output_field=AMOUNT_FIELD))).order_by()
+
+    def rebuild(self, user_ids=None, batch_size=1000):
+        with transaction.atomic():
+            rows = self.all()
+            if user_ids is not None:
+                user_ids = list(user_ids)
+                rows = rows.filter(user_id__in=user_ids)
+            rows.delete()
+            self.bulk_create(
+                (self.model(user_id=user, ingredient_id=ingredient,
+                            total_amount=total)
+                 for user, ingredient, total in self.expected(
+                    user_ids).iterator()),
+                batch_size=batch_size)
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='User')
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Ingredient')
+    total_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=3,
+        verbose_name='Total amount')
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'ShoppingCartIngredient'
+        verbose_name_plural = 'ShoppingCartIngredients'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_ingredient')]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} – {self.total_amount}'
+
+
+class ImageJobStatus:
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    choices = [
+        (PENDING, 'PENDING'),
+        (PROCESSING, 'PROCESSING'),
+        (DONE, 'DONE'),
+        (FAILED, 'FAILED')
+    ]
+
+
+class ImageJob(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+        verbose_name='Recipe')
+    image = models.CharField(
+        max_length=100,
+        verbose_name='Original image')
+    status = models.CharField(
+        max_length=10,
+        choices=ImageJobStatus.choices,
+        default=ImageJobStatus.PENDING,
+        verbose_name='Status')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Attempts')
+    error = models.TextField(
+        blank=True,
+        verbose_name='Error')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created')
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Updated')
+
+    class Meta:
+        verbose_name = 'ImageJob'
+        verbose_name_plural = 'ImageJobs'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                name='image_job_status_idx')]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.image} – {self.status}'
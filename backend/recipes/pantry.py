@@ -0,0 +1,195 @@
+from collections import defaultdict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_version, get_version
+
+CHUNK_SIZE = 10000
+
+
+def bitset(ids):
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for value in ids:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def drop_highest(bits, count):
+    low, high = 0, bits.bit_length()
+    while low < high:
+        middle = (low + high) // 2
+        if popcount(bits >> middle) <= count:
+            high = middle
+        else:
+            low = middle + 1
+    return bits & ((1 << low) - 1)
+
+
+def descending(bits, skip, take):
+    if skip:
+        bits = drop_highest(bits, skip)
+    while bits and take:
+        top = bits.bit_length() - 1
+        bits ^= 1 << top
+        take -= 1
+        yield top
+
+
+class RankedRecipes:
+
+    def __init__(self, groups):
+        self.groups = [(coverage, missing, bits, popcount(bits))
+                       for coverage, missing, bits in groups]
+
+    def __len__(self):
+        return sum(size for coverage, missing, bits, size in self.groups)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, step = index.indices(len(self))
+        found = []
+        for coverage, missing, bits, size in self.groups:
+            if stop <= 0:
+                break
+            if start < size:
+                found.extend((recipe, coverage, missing)
+                             for recipe in descending(
+                                 bits, start, min(stop, size) - start))
+            start = max(start - size, 0)
+            stop -= size
+        return found[::step]
+
+
+class PantryIndex:
+
+    def __init__(self):
+        self.bits = {}
+        self.sizes = {}
+        self.recipes = {}
+        self.loaded_at = None
+        self.token = None
+        self.lock = Lock()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def load(self, token):
+        from .models import IngredientRecipe
+
+        postings = defaultdict(list)
+        recipes = defaultdict(list)
+        for ingredient, recipe in IngredientRecipe.objects.values_list(
+                'ingredient_id', 'recipe_id').order_by().iterator(
+                chunk_size=CHUNK_SIZE):
+            postings[ingredient].append(recipe)
+            recipes[recipe].append(ingredient)
+        sizes = defaultdict(list)
+        for recipe, ingredients in recipes.items():
+            sizes[len(ingredients)].append(recipe)
+        self.bits = {ingredient: bitset(ids)
+                     for ingredient, ids in postings.items()}
+        self.sizes = {size: bitset(ids) for size, ids in sizes.items()}
+        self.recipes = {recipe: tuple(ingredients)
+                        for recipe, ingredients in recipes.items()}
+        self.token = token
+        self.loaded_at = monotonic()
+
+    def is_fresh(self, token):
+        return (self.loaded_at is not None and self.token == token
+                and monotonic() - self.loaded_at
+                < settings.PANTRY_INDEX_TIMEOUT)
+
+    def ensure_loaded(self):
+        token = get_version('pantry')['token']
+        if self.is_fresh(token):
+            return
+        with self.lock:
+            if not self.is_fresh(token):
+                self.load(token)
+
+    def toggle(self, bits, key, recipe, add):
+        value = bits.get(key, 0)
+        value = value | 1 << recipe if add else value & ~(1 << recipe)
+        if value:
+            bits[key] = value
+        else:
+            bits.pop(key, None)
+
+    def apply(self, recipe, ingredients):
+        old = self.recipes.pop(recipe, ())
+        for ingredient in old:
+            self.toggle(self.bits, ingredient, recipe, add=False)
+        if old:
+            self.toggle(self.sizes, len(old), recipe, add=False)
+        for ingredient in ingredients:
+            self.toggle(self.bits, ingredient, recipe, add=True)
+        if ingredients:
+            self.toggle(self.sizes, len(ingredients), recipe, add=True)
+            self.recipes[recipe] = tuple(ingredients)
+
+    def changed(self, recipe, ingredients=()):
+        token = get_version('pantry')['token']
+        with self.lock:
+            fresh = self.is_fresh(token)
+            if fresh:
+                self.apply(recipe, ingredients)
+            version = bump_version('pantry')
+            if fresh:
+                self.token = version['token']
+
+    def count_matches(self, ingredients):
+        planes = []
+        matched = 0
+        for ingredient in set(ingredients):
+            carry = self.bits.get(ingredient, 0)
+            matched |= carry
+            for number, plane in enumerate(planes):
+                planes[number], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        for count in range(1, 2 ** len(planes)):
+            mask = matched
+            for number, plane in enumerate(planes):
+                mask &= plane if count >> number & 1 else ~plane
+            if mask:
+                yield count, mask
+
+    def rank(self, ingredients, max_missing=None, min_coverage=0):
+        self.ensure_loaded()
+        groups = defaultdict(int)
+        for count, mask in self.count_matches(ingredients):
+            for size, recipes in self.sizes.items():
+                missing = size - count
+                if (missing < 0 or count / size < min_coverage
+                        or max_missing is not None
+                        and missing > max_missing):
+                    continue
+                group = mask & recipes
+                if group:
+                    groups[count / size, missing] |= group
+        return RankedRecipes(sorted(
+            ((coverage, missing, group)
+             for (coverage, missing), group in groups.items()),
+            key=lambda group: (-group[0], group[1])))
+
+
+pantry_index = PantryIndex()
+
+
+def recipe_changed(recipe_id, ingredient_ids=()):
+    ingredient_ids = sorted(set(ingredient_ids))
+    transaction.on_commit(
+        lambda: pantry_index.changed(recipe_id, ingredient_ids))
@@ -0,0 +1,111 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_WEIGHTS = '10.0, 2.0, 5.0'
+BATCH_SIZE = 500
+
+POSTGRES_UPDATE = f'''
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector('{SEARCH_CONFIG}', recipes_recipe.name), 'A')
+    || setweight(to_tsvector('{SEARCH_CONFIG}',
+                             coalesce(ingredients.names, '')), 'B')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', recipes_recipe.text), 'C')
+FROM (
+    SELECT recipe.id, string_agg(ingredient.name, ' ') AS names
+    FROM recipes_recipe recipe
+    LEFT JOIN recipes_ingredientrecipe amount ON amount.recipe_id = recipe.id
+    LEFT JOIN recipes_ingredient ingredient
+        ON ingredient.id = amount.ingredient_id
+    {{where}}
+    GROUP BY recipe.id
+) AS ingredients
+WHERE recipes_recipe.id = ingredients.id
+'''
+
+SQLITE_INSERT = f'''
+INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients)
+SELECT recipe.id, recipe.name, recipe.text,
+       coalesce(group_concat(ingredient.name, ' '), '')
+FROM recipes_recipe recipe
+LEFT JOIN recipes_ingredientrecipe amount ON amount.recipe_id = recipe.id
+LEFT JOIN recipes_ingredient ingredient ON ingredient.id = amount.ingredient_id
+{{where}}
+GROUP BY recipe.id
+'''
+
+
+def batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def update_search_index(recipe_ids=None, using=connection):
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            if recipe_ids is None:
+                cursor.execute(POSTGRES_UPDATE.format(where=''))
+                return
+            for batch in batches(recipe_ids):
+                cursor.execute(
+                    POSTGRES_UPDATE.format(where='WHERE recipe.id = ANY(%s)'),
+                    [batch])
+        elif using.vendor == 'sqlite':
+            if recipe_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(SQLITE_INSERT.format(where=''))
+                return
+            for batch in batches(recipe_ids):
+                marks = ', '.join(['%s'] * len(batch))
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({marks})',
+                    batch)
+                cursor.execute(SQLITE_INSERT.format(
+                    where=f'WHERE recipe.id IN ({marks})'), batch)
+
+
+def remove_from_search_index(recipe_id, using=connection):
+    if using.vendor == 'sqlite':
+        with using.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id])
+
+
+def fts_query(query):
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_recipes(queryset, query):
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.filter(RawSQL(
+            f'recipes_recipe.search_vector @@ {tsquery}', [query],
+            output_field=BooleanField())).annotate(search_rank=RawSQL(
+                f'ts_rank(recipes_recipe.search_vector, {tsquery})',
+                [query], output_field=FloatField())).order_by(
+            '-search_rank', '-pub_date')
+    if connection.vendor == 'sqlite':
+        match = fts_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match])).annotate(search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'AND rowid = recipes_recipe.id',
+                [match], output_field=FloatField())).order_by(
+            '-search_rank', '-pub_date')
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+        | Q(ingredients__name__icontains=query)).distinct().annotate(
+        search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,234 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .autocomplete import ingredient_index
+from .cache import (bump_version, bump_versions, recipe_version_name,
+                    recipes_changed)
+from .images import delete_variants
+from .models import (Ingredient, IngredientRecipe, Recipe, ShoppingCart,
+                     ShoppingCartIngredient, Tag, UnitConversion, User,
+                     carts_rebuilding)
+from .pantry import pantry_index
+from .search import remove_from_search_index, update_search_index
+
+AUTHOR_FIELDS = ['email', 'username', 'first_name', 'last_name']
+
+
+def ingredients_changed():
+    bump_version('ingredients')
+    ingredient_index.invalidate()
+
+
+def units_changed(ingredients=None):
+    if ingredients is None:
+        ingredients = Ingredient.objects.all()
+    changed = ingredients.link_units()
+    if changed:
+        ShoppingCartIngredient.objects.rebuild(
+            ShoppingCart.objects.filter(
+                recipe__ingredients__in=changed).values_list(
+                'user_id', flat=True).distinct())
+
+
+def pending_ids(name):
+    connection = transaction.get_connection()
+    if not hasattr(connection, name):
+        setattr(connection, name, set())
+    return getattr(connection, name)
+
+
+def defer(name, ids, flush):
+    pending = pending_ids(name)
+    ids = set(ids)
+    if ids:
+        pending.update(ids)
+        transaction.on_commit(lambda: flush_pending(pending, flush))
+
+
+def flush_pending(pending, flush):
+    if pending:
+        ids = list(pending)
+        pending.clear()
+        flush(ids)
+
+
+def rebuild_carts(user_ids):
+    defer('pending_carts', user_ids, ShoppingCartIngredient.objects.rebuild)
+
+
+def flush_recipe_rows(recipe_ids):
+    Recipe.objects.filter(id__in=recipe_ids).expire_snapshots()
+    bump_versions([recipe_version_name(pk) for pk in recipe_ids])
+    user_ids = list(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids).values_list('user_id', flat=True).distinct())
+    if user_ids:
+        ShoppingCartIngredient.objects.rebuild(user_ids)
+
+
+def ingredient_rows_applied(recipe_ids):
+    pending_ids('pending_recipe_rows').difference_update(recipe_ids)
+
+
+def relink_ingredients(name, ingredient_id):
+    units_changed(Ingredient.objects.filter(id__in=list(
+        Ingredient.objects.filter(
+            Q(name=name) | Q(base_id=ingredient_id)).values_list(
+            'id', flat=True))))
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredients(instance, **kwargs):
+    name, ingredient_id = instance.name, instance.id
+    transaction.on_commit(ingredients_changed)
+    transaction.on_commit(lambda: relink_ingredients(name, ingredient_id))
+
+
+@receiver([post_save, post_delete], sender=UnitConversion)
+def relink_units(**kwargs):
+    transaction.on_commit(units_changed)
+
+
+@receiver(post_delete, sender=Ingredient)
+def invalidate_pantry(**kwargs):
+    transaction.on_commit(lambda: bump_version('pantry'))
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(instance, created, **kwargs):
+    if created:
+        return
+    transaction.on_commit(lambda: update_search_index(
+        Recipe.objects.filter(ingredients=instance).values_list(
+            'id', flat=True)))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags(**kwargs):
+    transaction.on_commit(lambda: bump_version('tags'))
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_recipe_content(**kwargs):
+    recipes_changed(content=True)
+
+
+@receiver([post_save, pre_delete], sender=Ingredient)
+def expire_ingredient_snapshots(instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).expire_snapshots()
+
+
+@receiver([post_save, pre_delete], sender=Tag)
+def expire_tag_snapshots(instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).expire_snapshots()
+
+
+@receiver(post_save, sender=Recipe)
+def expire_recipe_snapshot(instance, **kwargs):
+    if instance.snapshot:
+        instance.snapshot = {}
+        Recipe.objects.filter(id=instance.id).expire_snapshots()
+
+
+@receiver([post_save, post_delete], sender=IngredientRecipe)
+def expire_ingredient_recipe_snapshot(instance, **kwargs):
+    defer('pending_recipe_rows', [instance.recipe_id], flush_recipe_rows)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance, created, **kwargs):
+    transaction.on_commit(lambda: update_search_index([instance.id]))
+    recipes_changed([instance.id], lists=created)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_rows(instance, **kwargs):
+    ingredient_rows_applied([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_variants(instance, **kwargs):
+    variants = instance.image_variants
+    transaction.on_commit(lambda: delete_variants(variants))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(instance, **kwargs):
+    recipe_id = instance.id
+    transaction.on_commit(lambda: remove_from_search_index(recipe_id))
+    transaction.on_commit(lambda: pantry_index.changed(recipe_id))
+    recipes_changed([recipe_id], lists=True)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_'):
+        recipes_changed([] if reverse else [instance.id], lists=True,
+                        content=reverse)
+    if reverse and pk_set and action.startswith('post_'):
+        Recipe.objects.filter(id__in=pk_set).expire_snapshots()
+
+
+@receiver(pre_save, sender=User)
+def remember_author(instance, update_fields=None, **kwargs):
+    instance.author_before = None
+    if instance.pk is None or (
+            update_fields is not None
+            and not set(update_fields) & set(AUTHOR_FIELDS)):
+        return
+    instance.author_before = User.objects.filter(
+        Exists(Recipe.objects.filter(author=OuterRef('pk'))),
+        pk=instance.pk).values(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(instance, **kwargs):
+    before = getattr(instance, 'author_before', None)
+    if before is None or all(before[field] == getattr(instance, field)
+                             for field in AUTHOR_FIELDS):
+        return
+    recipes = Recipe.objects.filter(author=instance)
+    recipes.expire_snapshots()
+    recipes_changed(recipes.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=User)
+def release_user_counters(instance, **kwargs):
+    recipes_changed(content=True)
+    Recipe.objects.filter(in_favorite__user=instance).bump_counter(
+        'favorites_count', -1)
+    Recipe.objects.filter(shopping_cart__user=instance).bump_counter(
+        'shopping_cart_count', -1)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+def remember_multiplier(instance, update_fields=None, **kwargs):
+    instance.multiplier_before = None
+    if instance._state.adding or (
+            update_fields is not None and 'multiplier' not in update_fields):
+        return
+    instance.multiplier_before = ShoppingCart.objects.filter(
+        pk=instance.pk).values_list('multiplier', flat=True).first()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_cart_ingredients(instance, created, **kwargs):
+    before = 0 if created else getattr(instance, 'multiplier_before', None)
+    if before is not None and before != instance.multiplier:
+        ShoppingCartIngredient.objects.apply_recipe(
+            {instance.user_id: instance.multiplier - before},
+            instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def release_cart_ingredients(instance, **kwargs):
+    if carts_rebuilding():
+        rebuild_carts([instance.user_id])
+    else:
+        ShoppingCartIngredient.objects.apply_recipe(
+            {instance.user_id: instance.multiplier}, instance.recipe_id, -1)
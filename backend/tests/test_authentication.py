@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import SharedTokenCache
+from users.models import User
+
+
+@override_settings(AUTH_TOKEN_CACHE='shared')
+class SharedTokenCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='user', email='user@example.com', password='pw')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def me(self, status_code=200):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, status_code)
+        return response
+
+    def test_cache_holds_no_password_hash(self):
+        self.me()
+        values = cache.get(SharedTokenCache().cache_key(self.token.key))
+        self.assertIsNotNone(values)
+        self.assertNotIn('password', values)
+        self.assertNotIn(self.user.password, values.values())
+
+    def test_cached_user_skips_token_query(self):
+        with CaptureQueriesContext(connection) as first:
+            self.me()
+        with CaptureQueriesContext(connection) as second:
+            response = self.me()
+        self.assertEqual(response.data['email'], 'user@example.com')
+        self.assertLess(len(second), len(first))
+
+    def test_cached_user_save_keeps_password(self):
+        self.me()
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'pw', 'new_password': 'Sup3r-secret-pw'})
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Sup3r-secret-pw'))
+        self.assertEqual(self.user.username, 'user')
+
+    def test_deactivation_revokes_cached_token(self):
+        self.me()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.me(401)
+
+    def test_logout_revokes_cached_token(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.me(401)
+
+
+@override_settings(AUTH_TOKEN_CACHE='')
+class DisabledTokenCacheTest(TestCase):
+
+    def test_user_save_skips_token_invalidation(self):
+        user = User.objects.create_user(
+            username='user', email='user@example.com', password='pw')
+        Token.objects.create(user=user)
+        user.first_name = 'Иван'
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                user.save()
+        self.assertEqual(callbacks, [])
+        self.assertFalse(any('authtoken_token' in query['sql']
+                             for query in context.captured_queries))
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient
+
+
+class IngredientAutocompleteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ['Сахар', 'сахарная пудра', 'ванильный сахар', 'соль',
+                     'Сахарин']:
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def names(self, query):
+        response = self.client.get('/api/ingredients/', {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data]
+
+    def test_prefix_matches_come_before_substring_matches(self):
+        self.assertEqual(self.names('САХ'), [
+            'Сахар', 'Сахарин', 'сахарная пудра', 'ванильный сахар'])
+
+    @override_settings(INGREDIENT_AUTOCOMPLETE_LIMIT=2)
+    def test_results_are_limited(self):
+        self.assertEqual(self.names('сах'), ['Сахар', 'Сахарин'])
+
+    def test_warm_index_skips_database(self):
+        self.names('со')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('со'), ['соль'])
+
+    def test_new_ingredient_is_found(self):
+        self.assertEqual(self.names('соле'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='солёные огурцы',
+                                      measurement_unit='г')
+        self.assertEqual(self.names('сол'), ['соль', 'солёные огурцы'])
@@ -0,0 +1,95 @@
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+from .test_shopping_cart import ShoppingCartTestCase
+
+CART_BULK_URL = '/api/recipes/shopping_cart/bulk/'
+FAVORITE_BULK_URL = '/api/recipes/favorite/bulk/'
+
+
+class BulkRelationsTest(ShoppingCartTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.soup = self.create_recipe({self.first: 100})
+        self.cake = self.create_recipe({self.first: 50, self.second: 200})
+        self.bread = self.create_recipe({self.second: 10})
+        self.missing = Recipe.objects.order_by('id').last().id + 1
+
+    def bulk(self, action, recipes, url=CART_BULK_URL):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {'action': action, 'recipes': recipes}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def statuses(self, data):
+        return [(row['id'], row['status']) for row in data['results']]
+
+    def counters(self, field='shopping_cart_count'):
+        return dict(Recipe.objects.values_list('id', field))
+
+    def cart_recipes(self, model=ShoppingCart):
+        return set(model.objects.filter(user=self.user).values_list(
+            'recipe_id', flat=True))
+
+    def test_add(self):
+        self.bulk('add', [self.soup.id])
+        data = self.bulk('add', [self.cake.id, self.soup.id, self.missing,
+                                 self.cake.id])
+        self.assertEqual((data['added'], data['removed']), (1, 0))
+        self.assertEqual(self.statuses(data), [
+            (self.cake.id, 'added'), (self.soup.id, 'exists'),
+            (self.missing, 'not_found')])
+        self.assertEqual(self.cart_recipes(), {self.soup.id, self.cake.id})
+        self.assertEqual(self.counters(), {
+            self.soup.id: 1, self.cake.id: 1, self.bread.id: 0})
+        self.assertEqual(self.cart(), {self.first.id: 150,
+                                       self.second.id: 200})
+
+    def test_remove(self):
+        self.bulk('add', [self.soup.id, self.cake.id])
+        data = self.bulk('remove', [self.cake.id, self.bread.id,
+                                    self.missing])
+        self.assertEqual((data['added'], data['removed']), (0, 1))
+        self.assertEqual(self.statuses(data), [
+            (self.cake.id, 'removed'), (self.bread.id, 'absent'),
+            (self.missing, 'not_found')])
+        self.assertEqual(self.cart_recipes(), {self.soup.id})
+        self.assertEqual(self.counters(), {
+            self.soup.id: 1, self.cake.id: 0, self.bread.id: 0})
+        self.assertEqual(self.cart(), {self.first.id: 100})
+
+    def test_replace(self):
+        self.bulk('add', [self.soup.id, self.cake.id])
+        data = self.bulk('replace', [self.bread.id, self.cake.id])
+        self.assertEqual((data['added'], data['removed']), (1, 1))
+        self.assertEqual(self.statuses(data), [
+            (self.bread.id, 'added'), (self.cake.id, 'exists'),
+            (self.soup.id, 'removed')])
+        self.assertEqual(self.cart_recipes(), {self.cake.id, self.bread.id})
+        self.assertEqual(self.counters(), {
+            self.soup.id: 0, self.cake.id: 1, self.bread.id: 1})
+        self.assertEqual(self.cart(), {self.first.id: 50,
+                                       self.second.id: 210})
+
+    def test_replace_with_nothing_clears(self):
+        self.bulk('add', [self.soup.id, self.cake.id])
+        data = self.bulk('replace', [])
+        self.assertEqual(self.statuses(data), sorted([
+            (self.soup.id, 'removed'), (self.cake.id, 'removed')]))
+        self.assertEqual(self.cart_recipes(), set())
+        self.assertEqual(self.cart(), {})
+
+    def test_empty_add_is_rejected(self):
+        response = self.client.post(
+            CART_BULK_URL, {'action': 'add', 'recipes': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_favorites(self):
+        data = self.bulk('replace', [self.soup.id, self.missing],
+                         FAVORITE_BULK_URL)
+        self.assertEqual(self.statuses(data), [
+            (self.soup.id, 'added'), (self.missing, 'not_found')])
+        self.assertEqual(self.cart_recipes(Favorite), {self.soup.id})
+        self.assertEqual(self.counters('favorites_count')[self.soup.id], 1)
+        self.assertEqual(self.cart(), {})
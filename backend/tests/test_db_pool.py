@@ -0,0 +1,144 @@
+from threading import Barrier, Lock, Thread
+from time import sleep
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from api.metrics import registry
+from foodgram_backend.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.autocommit = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        if self.closed:
+            raise RuntimeError('closed')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def setUp(self):
+        self.opened = []
+        self.now = 1000.0
+        clock = patch('foodgram_backend.db.pool.monotonic',
+                      lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def test_released_connection_is_reused(self):
+        pool = ConnectionPool(2, 1, None)
+        connection = pool.acquire(self.connect)
+        pool.release(connection)
+        self.assertIs(pool.acquire(self.connect), connection)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(connection.rollbacks, 1)
+
+    def test_waits_until_timeout_when_full(self):
+        pool = ConnectionPool(1, 0.05, None)
+        pool.acquire(self.connect)
+        timeouts = registry.pool_timeouts
+        with patch.object(pool.condition, 'wait') as wait:
+            wait.side_effect = lambda remaining: setattr(
+                self, 'now', self.now + remaining)
+            with self.assertRaises(PoolTimeout):
+                pool.acquire(self.connect)
+        self.assertEqual(wait.call_count, 1)
+        self.assertAlmostEqual(wait.call_args.args[0], 0.05)
+        self.assertEqual(registry.pool_timeouts, timeouts + 1)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = ConnectionPool(1, 5, None)
+        connection = pool.acquire(self.connect)
+        acquired = []
+        waiter = Thread(target=lambda: acquired.append(
+            pool.acquire(self.connect)))
+        waiter.start()
+        sleep(0.05)
+        pool.release(connection)
+        waiter.join(5)
+        self.assertEqual(acquired, [connection])
+
+    def test_expired_connection_is_replaced(self):
+        pool = ConnectionPool(1, 1, 60)
+        connection = pool.acquire(self.connect)
+        pool.release(connection)
+        self.now += 61
+        fresh = pool.acquire(self.connect)
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 1)
+
+    def test_expired_connection_is_not_returned_to_pool(self):
+        pool = ConnectionPool(1, 1, 60)
+        connection = pool.acquire(self.connect)
+        self.now += 61
+        pool.release(connection)
+        self.assertEqual(pool.idle, [])
+        self.assertEqual(pool.size, 0)
+        self.assertTrue(connection.closed)
+
+    def test_dead_connections_are_discarded(self):
+        pool = ConnectionPool(2, 1, None)
+        closed = pool.acquire(self.connect)
+        rejected = pool.acquire(self.connect)
+        closed.close()
+        pool.release(closed)
+        self.assertEqual(pool.size, 1)
+        pool.release(rejected)
+        self.assertIsNot(pool.acquire(
+            self.connect, check=lambda connection: False), rejected)
+        self.assertTrue(rejected.closed)
+        self.assertEqual(pool.size, 1)
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool(1, 1, None)
+
+        def refuse():
+            raise OSError('refused')
+
+        with self.assertRaises(OSError):
+            pool.acquire(refuse)
+        self.assertEqual(pool.size, 0)
+        self.assertIsNotNone(pool.acquire(self.connect))
+
+    def test_size_limit_under_threads(self):
+        pool = ConnectionPool(3, 5, None)
+        barrier = Barrier(10)
+        lock = Lock()
+        active = []
+        peaks = []
+
+        def work():
+            barrier.wait()
+            for _ in range(20):
+                connection = pool.acquire(self.connect)
+                with lock:
+                    active.append(connection)
+                    peaks.append(len(active))
+                with lock:
+                    active.remove(connection)
+                pool.release(connection)
+
+        threads = [Thread(target=work) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertLessEqual(max(peaks), 3)
+        self.assertLessEqual(len(self.opened), 3)
+        self.assertEqual(len(peaks), 200)
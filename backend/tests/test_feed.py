@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import Follow, User
+
+
+class RecipeFeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pw')
+        cls.followed, cls.other = [User.objects.create_user(
+            username=name, email=f'{name}@example.com', password='pw')
+            for name in ['followed', 'other']]
+        Follow.objects.create(user=cls.reader, author=cls.followed)
+        cls.tag = Tag.objects.create(name='tag', color='#000000', slug='tag')
+        published = timezone.now()
+        cls.recipes = []
+        for number in range(7):
+            for author in (cls.followed, cls.other):
+                recipe = Recipe.objects.create(
+                    author=author, name=f'recipe{number}', text='text',
+                    cooking_time=5)
+                if number % 2:
+                    recipe.tags.set([cls.tag])
+                if author == cls.followed:
+                    cls.recipes.append(recipe)
+        Recipe.objects.update(pub_date=published)
+        cls.recipes.sort(key=lambda recipe: -recipe.id)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_followed_authors_newest_first(self):
+        self.assertEqual(self.walk('/api/recipes/feed/?limit=3'),
+                         [recipe.id for recipe in self.recipes])
+
+    def test_filters_apply_to_feed(self):
+        self.assertEqual(self.walk('/api/recipes/feed/?tags=tag&limit=2'), [
+            recipe.id for recipe in self.recipes
+            if recipe.tags.filter(id=self.tag.id).exists()])
+
+    def test_queries_do_not_grow_with_page_size(self):
+        counts = []
+        for limit in (1, 7):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(f'/api/recipes/feed/?limit={limit}')
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+
+class RecipeTagFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        cls.breakfast, cls.lunch, cls.dinner = [Tag.objects.create(
+            name=slug, color=f'#00000{number}', slug=slug)
+            for number, slug in enumerate(['breakfast', 'lunch', 'dinner'])]
+        cls.both = Recipe.objects.create(
+            author=author, name='both', text='text', cooking_time=5)
+        cls.both.tags.set([cls.breakfast, cls.lunch])
+        cls.lunch_only = Recipe.objects.create(
+            author=author, name='lunch', text='text', cooking_time=5)
+        cls.lunch_only.tags.set([cls.lunch])
+        cls.untagged = Recipe.objects.create(
+            author=author, name='untagged', text='text', cooking_time=5)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def ids(self, tags):
+        response = self.client.get('/api/recipes/', {'tags': tags})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'],
+                         len(response.data['results']))
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_several_matching_tags_do_not_duplicate_recipes(self):
+        self.assertEqual(self.ids(['breakfast', 'lunch']),
+                         [self.lunch_only.id, self.both.id])
+
+    def test_single_tag(self):
+        self.assertEqual(self.ids(['breakfast']), [self.both.id])
+
+    def test_tag_without_recipes(self):
+        self.assertEqual(self.ids(['dinner']), [])
+
+    def test_unknown_tag_is_rejected(self):
+        response = self.client.get('/api/recipes/', {'tags': ['brunch']})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.images import claim_job, process_job
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+from .test_query_budgets import image_data
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageFilesTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(name='tag', color='#000000', slug='tag')
+        ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г')
+        self.payload = {'tags': [tag.id],
+                        'ingredients': [{'id': ingredient.id, 'amount': 5}],
+                        'name': 'recipe', 'text': 'text',
+                        'cooking_time': 10}
+
+    def process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(process_job(claim_job()))
+
+    def variant_paths(self, recipe_id):
+        variants = Recipe.objects.get(id=recipe_id).image_variants
+        return [path for formats in variants.values()
+                for path in formats.values()]
+
+    def test_replaced_and_deleted_images_remove_variants(self):
+        response = self.client.post(
+            '/api/recipes/', {**self.payload, 'image': image_data()},
+            format='json')
+        recipe_id = response.data['id']
+        self.process()
+        first = self.variant_paths(recipe_id)
+        self.assertTrue(first)
+        self.assertTrue(all(default_storage.exists(path) for path in first))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/recipes/{recipe_id}/',
+                              {'image': image_data()}, format='json')
+        self.assertFalse(any(default_storage.exists(path) for path in first))
+        self.process()
+        second = self.variant_paths(recipe_id)
+        self.assertTrue(all(default_storage.exists(path) for path in second))
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(id=recipe_id).delete()
+        self.assertFalse(any(default_storage.exists(path) for path in second))
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+
+class RecipeCursorPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'recipe{number}', text='text',
+                   cooking_time=5) for number in range(5))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_cursor_walks_newest_first(self):
+        response = self.client.get('/api/recipes/?cursor=&limit=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    def test_cursor_is_rejected_for_popular_ordering(self):
+        response = self.client.get('/api/recipes/?cursor=&ordering=popular')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_popular_ordering_uses_pages(self):
+        response = self.client.get('/api/recipes/?ordering=popular&limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
@@ -0,0 +1,139 @@
+import random
+from time import monotonic
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from recipes.cache import get_version
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+from recipes.pantry import PantryIndex, pantry_index, recipe_changed
+from users.models import User
+
+
+class PantryRankingTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        generator = random.Random(31)
+        self.recipes = {
+            recipe: tuple(generator.sample(range(1, 40),
+                                           generator.randint(1, 8)))
+            for recipe in generator.sample(range(1, 3000), 300)}
+        self.index = PantryIndex()
+        for recipe, ingredients in self.recipes.items():
+            self.index.apply(recipe, ingredients)
+        self.index.token = get_version('pantry')['token']
+        self.index.loaded_at = monotonic()
+        self.generator = generator
+
+    def expected(self, query, max_missing=None, min_coverage=0):
+        rows = []
+        for recipe, ingredients in self.recipes.items():
+            count = len(set(ingredients) & set(query))
+            missing = len(ingredients) - count
+            coverage = count / len(ingredients)
+            if (count and coverage >= min_coverage
+                    and (max_missing is None or missing <= max_missing)):
+                rows.append((recipe, coverage, missing))
+        return sorted(rows, key=lambda row: (-row[1], row[2], -row[0]))
+
+    def test_matches_brute_force(self):
+        for _ in range(50):
+            query = self.generator.sample(range(1, 45),
+                                          self.generator.randint(1, 12))
+            options = self.generator.choice([
+                {}, {'max_missing': 2}, {'min_coverage': 0.5},
+                {'max_missing': 0}])
+            ranked = self.index.rank(query, **options)
+            expected = self.expected(query, **options)
+            self.assertEqual(len(ranked), len(expected))
+            self.assertEqual(ranked[:], expected)
+            for _ in range(5):
+                start = self.generator.randint(0, len(expected))
+                stop = start + self.generator.randint(0, 15)
+                self.assertEqual(ranked[start:stop], expected[start:stop])
+
+    def test_unknown_ingredients(self):
+        self.assertEqual(len(self.index.rank([1000, 1001])), 0)
+
+    def test_apply_replaces_recipe_ingredients(self):
+        recipe = next(iter(self.recipes))
+        self.recipes[recipe] = (41, 42)
+        self.index.apply(recipe, (41, 42))
+        self.assertEqual(self.index.rank([41])[:],
+                         [(recipe, 0.5, 1)])
+        self.recipes.pop(recipe)
+        self.index.apply(recipe, ())
+        self.assertEqual(self.index.rank([41, 42])[:], [])
+        query = [1, 2, 3, 4, 5]
+        self.assertEqual(self.index.rank(query)[:], self.expected(query))
+
+
+class PantryEndpointTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        cls.flour, cls.eggs, cls.milk, cls.salt = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ['мука', 'яйца', 'молоко', 'соль']]
+        cls.pancakes = cls.create_recipe(
+            author, [cls.flour, cls.eggs, cls.milk])
+        cls.omelette = cls.create_recipe(author, [cls.eggs, cls.milk])
+        cls.bread = cls.create_recipe(author, [cls.flour, cls.salt])
+
+    @staticmethod
+    def create_recipe(author, ingredients):
+        recipe = Recipe.objects.create(
+            author=author, name='recipe', text='text', cooking_time=5)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients)
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        pantry_index.invalidate()
+        self.client = APIClient()
+
+    def pantry(self, **params):
+        response = self.client.get('/api/recipes/pantry/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(recipe['id'], recipe['coverage'], recipe['missing_count'])
+                for recipe in response.data['results']]
+
+    def test_ranks_by_coverage_then_missing(self):
+        ingredients = f'{self.eggs.id},{self.milk.id}'
+        self.assertEqual(self.pantry(ingredients=ingredients), [
+            (self.omelette.id, 1.0, 0),
+            (self.pancakes.id, 0.6667, 1)])
+
+    def test_filters_and_pages(self):
+        ingredients = f'{self.flour.id},{self.eggs.id}'
+        self.assertEqual(
+            self.pantry(ingredients=ingredients, max_missing=0), [])
+        self.assertEqual(
+            self.pantry(ingredients=ingredients, min_coverage=0.6),
+            [(self.pancakes.id, 0.6667, 1)])
+        response = self.client.get('/api/recipes/pantry/', {
+            'ingredients': ingredients, 'limit': 1, 'page': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([recipe['id'] for recipe in
+                          response.data['results']], [self.bread.id])
+
+    def test_empty_ingredients_are_rejected(self):
+        response = self.client.get('/api/recipes/pantry/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_recipe_change_updates_index(self):
+        self.assertEqual(self.pantry(ingredients=str(self.salt.id)),
+                         [(self.bread.id, 0.5, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientRecipe.objects.create(
+                recipe=self.omelette, ingredient=self.salt, amount=1)
+            recipe_changed(
+                self.omelette.id, [self.eggs.id, self.milk.id, self.salt.id])
+        self.assertEqual(self.pantry(ingredients=str(self.salt.id)), [
+            (self.bread.id, 0.5, 1), (self.omelette.id, 0.3333, 2)])
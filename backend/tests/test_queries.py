@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+class QueryCountTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pw')
+        cls.authors = [User.objects.create_user(
+            username=f'author{number}',
+            email=f'author{number}@example.com',
+            password='pw') for number in range(4)]
+        tags = [Tag.objects.create(
+            name=f'tag{number}', color=f'#00000{number}',
+            slug=f'tag{number}') for number in range(3)]
+        ingredients = [Ingredient.objects.create(
+            name=f'ingredient{number}', measurement_unit='г')
+            for number in range(10)]
+        for number in range(12):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % len(cls.authors)],
+                name=f'recipe{number}', text='text', cooking_time=5)
+            recipe.tags.set(tags[:1 + number % len(tags)])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=10 + offset)
+                for offset, ingredient in enumerate(
+                    ingredients[number % 5:number % 5 + 4]))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assert_flat(self, url, small, large):
+        expected = self.count_queries(url.format(limit=small))
+        cache.clear()
+        with self.assertNumQueries(expected):
+            response = self.client.get(url.format(limit=large))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class RecipeListQueriesTest(QueryCountTestCase):
+
+    def test_queries_do_not_grow_with_page_size(self):
+        response = self.assert_flat('/api/recipes/?limit={limit}', 2, 10)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class SubscriptionsQueriesTest(QueryCountTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for author in cls.authors:
+            cls.user.follower.create(author=author)
+
+    def test_queries_do_not_grow_with_recipes_limit(self):
+        response = self.assert_flat(
+            '/api/users/subscriptions/?recipes_limit={limit}', 1, 3)
+        self.assertEqual(
+            [len(author['recipes']) for author in response.data['results']],
+            [3] * len(self.authors))
+
+    def test_queries_do_not_grow_with_page_size(self):
+        self.assert_flat(
+            '/api/users/subscriptions/?recipes_limit=2&limit={limit}', 1, 4)
+
+    def test_no_subscriptions(self):
+        self.client.force_authenticate(self.authors[0])
+        response = self.client.get(
+            '/api/users/subscriptions/?recipes_limit=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
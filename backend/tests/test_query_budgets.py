@@ -0,0 +1,141 @@
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4)).save(buffer, 'PNG')
+    return f'data:image/png;base64,{b64encode(buffer.getvalue()).decode()}'
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, AUTH_TOKEN_CACHE='',
+                   MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTest(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pw')
+        self.authors = [User.objects.create_user(
+            username=f'author{number}',
+            email=f'author{number}@example.com',
+            password='pw') for number in range(3)]
+        self.tags = [Tag.objects.create(
+            name=f'tag{number}', color=f'#00000{number}',
+            slug=f'tag{number}') for number in range(2)]
+        self.ingredients = [Ingredient.objects.create(
+            name=f'ingredient{number}', measurement_unit='г')
+            for number in range(14)]
+        self.recipes = []
+        for number in range(6):
+            recipe = Recipe.objects.create(
+                author=self.authors[number % len(self.authors)],
+                name=f'recipe{number}', text='text', cooking_time=5)
+            recipe.tags.set(self.tags)
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=10)
+                for ingredient in self.ingredients[number % 3:][:3])
+            self.recipes.append(recipe)
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        self.own = Recipe.objects.create(
+            author=self.user, name='own', text='text', cooking_time=5)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=self.own, ingredient=ingredient,
+                             amount=10)
+            for ingredient in self.ingredients[:10])
+        for user in (self.user, self.authors[1]):
+            ShoppingCart.objects.create(user=user, recipe=self.own)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}')
+
+    def request(self, method, url, data=None, status_code=200):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status_code,
+                         getattr(response, 'data', None))
+        return len(context.captured_queries)
+
+    def ingredients_payload(self, start):
+        return [{'id': ingredient.id, 'amount': 5 + start}
+                for ingredient in self.ingredients[start:start + 10]]
+
+    def recipe_payload(self, start=0, **fields):
+        return {'tags': [tag.id for tag in self.tags],
+                'ingredients': self.ingredients_payload(start),
+                'name': 'new', 'text': 'text', 'cooking_time': 10,
+                'image': image_data(), **fields}
+
+    def test_user_endpoints(self):
+        author = self.authors[1].id
+        self.request('get', '/api/users/')
+        self.request('get', f'/api/users/{author}/')
+        self.request('get', '/api/users/me/')
+        self.request('get', '/api/users/subscriptions/?recipes_limit=2')
+        self.request('post', f'/api/users/{author}/subscribe/',
+                     status_code=201)
+        self.request('delete', f'/api/users/{author}/subscribe/',
+                     status_code=204)
+        self.client.credentials(HTTP_AUTHORIZATION=(
+            f'Token {Token.objects.create(user=self.authors[2])}'))
+        self.request('get', '/api/users/subscriptions/?recipes_limit=3')
+
+    def test_recipe_reads(self):
+        self.request('get', '/api/recipes/')
+        self.request('get', f'/api/recipes/{self.recipes[1].id}/')
+        self.request('get', '/api/recipes/feed/')
+        self.request('get', '/api/recipes/pantry/?ingredients='
+                     f'{self.ingredients[0].id},{self.ingredients[1].id}')
+        self.request('get', '/api/recipes/download_shopping_cart/')
+        self.request('get', '/api/tags/')
+        self.request('get', '/api/ingredients/')
+
+    def test_recipe_writes(self):
+        self.request('post', '/api/recipes/', self.recipe_payload(),
+                     status_code=201)
+        url = f'/api/recipes/{self.own.id}/'
+        self.request('patch', url, {'name': 'renamed'})
+        self.request('patch', url,
+                     {'ingredients': self.ingredients_payload(2)})
+        self.request('put', url, self.recipe_payload(4))
+        self.request('delete', url, status_code=204)
+
+    def test_relation_writes(self):
+        url = f'/api/recipes/{self.recipes[1].id}'
+        self.request('post', f'{url}/favorite/', status_code=201)
+        self.request('delete', f'{url}/favorite/', status_code=204)
+        self.request('post', f'{url}/shopping_cart/', status_code=201)
+        self.request('patch', f'{url}/shopping_cart/', {'multiplier': 2})
+        self.request('delete', f'{url}/shopping_cart/', status_code=204)
+        ids = [recipe.id for recipe in self.recipes]
+        for kind in ('favorite', 'shopping_cart'):
+            self.request('post', f'/api/recipes/{kind}/bulk/',
+                         {'action': 'add', 'recipes': ids})
+            self.request('post', f'/api/recipes/{kind}/bulk/',
+                         {'action': 'remove', 'recipes': ids})
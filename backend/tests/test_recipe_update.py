@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, IngredientRecipe
+
+from .test_shopping_cart import ShoppingCartTestCase
+
+
+class RecipeIngredientUpdateTest(ShoppingCartTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.third = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+        self.recipe = self.create_recipe(
+            {self.first: 100, self.second: 300}, author=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.client.force_authenticate(self.user)
+
+    def rows(self):
+        return {ingredient: (pk, amount) for pk, ingredient, amount in
+                IngredientRecipe.objects.filter(recipe=self.recipe)
+                .values_list('id', 'ingredient_id', 'amount')}
+
+    def patch(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_diff_keeps_unchanged_rows(self):
+        before = self.rows()
+        response = self.patch({'ingredients': [
+            {'id': self.first.id, 'amount': 100},
+            {'id': self.third.id, 'amount': 5}]})
+        after = self.rows()
+        self.assertEqual(after.keys(), {self.first.id, self.third.id})
+        self.assertEqual(after[self.first.id], before[self.first.id])
+        self.assertEqual(after[self.third.id][1], 5)
+        self.assertEqual(
+            sorted((row['id'], row['amount'])
+                   for row in response.data['ingredients']),
+            sorted([(self.first.id, 100), (self.third.id, 5)]))
+        for user in (self.user, self.author):
+            self.assertEqual(self.cart(user), {self.first.id: 100,
+                                               self.third.id: 5})
+
+    def test_changed_amount_updates_row_in_place(self):
+        before = self.rows()
+        self.patch({'ingredients': [
+            {'id': self.first.id, 'amount': 150},
+            {'id': self.second.id, 'amount': 300}]})
+        after = self.rows()
+        self.assertEqual(after[self.first.id],
+                         (before[self.first.id][0], 150))
+        self.assertEqual(after[self.second.id], before[self.second.id])
+        self.assertEqual(self.cart(self.author), {self.first.id: 150,
+                                                  self.second.id: 300})
+
+    def test_patch_without_ingredients_keeps_rows(self):
+        before = self.rows()
+        with CaptureQueriesContext(connection) as context:
+            self.patch({'name': 'renamed'})
+        table = IngredientRecipe._meta.db_table
+        writes = tuple(f'{verb} "{table}"' for verb in
+                       ['INSERT INTO', 'UPDATE', 'DELETE FROM'])
+        self.assertFalse([query['sql'] for query in context.captured_queries
+                          if query['sql'].startswith(writes)])
+        self.assertEqual(self.rows(), before)
+        self.assertEqual(self.cart(), {self.first.id: 100,
+                                       self.second.id: 300})
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'renamed')
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+
+class AnonymousRecipeCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw',
+            first_name='Анна')
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='recipe', text='text', cooking_time=5)
+        self.client = APIClient()
+
+    def cache_result(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache']
+
+    def test_registration_keeps_list_cached(self):
+        self.cache_result()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/', {
+                'email': 'new@example.com', 'username': 'new',
+                'first_name': 'Иван', 'last_name': 'Петров',
+                'password': 'Sup3r-secret-pw'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.cache_result(), 'HIT')
+
+    def test_unrelated_author_changes_keep_list_cached(self):
+        self.cache_result()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.set_password('another-pw')
+            self.author.save()
+        self.assertEqual(self.cache_result(), 'HIT')
+
+    def test_author_rename_refreshes_list(self):
+        self.cache_result()
+        self.author.first_name = 'Мария'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertEqual(self.cache_result(), 'MISS')
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(
+            response.data['results'][0]['author']['first_name'], 'Мария')
+
+    def test_padded_id_detail_refreshes(self):
+        url = f'/api/recipes/0{self.recipe.id}/'
+        self.assertEqual(self.client.get(url).data['name'], 'recipe')
+        self.recipe.name = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'renamed')
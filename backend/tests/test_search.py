@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+from users.models import User
+
+
+class RecipeSearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        self.tomato = Ingredient.objects.create(
+            name='томаты', measurement_unit='г')
+        self.soup = self.create_recipe('Томатный суп', 'Сварить овощи.')
+        self.salad = self.create_recipe(
+            'Летний салат', 'Нарезать томатный соус и зелень.')
+        self.pasta = self.create_recipe('Паста', 'Отварить пасту.',
+                                        [self.tomato])
+        self.client = APIClient()
+
+    def create_recipe(self, name, text, ingredients=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author, name=name, text=text, cooking_time=5)
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in ingredients)
+        return recipe
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_match_ranks_above_text_match(self):
+        self.assertEqual(self.search('томатный'),
+                         [self.soup.id, self.salad.id])
+
+    def test_ingredient_names_are_searchable(self):
+        self.assertEqual(self.search('томаты'), [self.pasta.id])
+
+    def test_prefix_and_punctuation(self):
+        self.assertEqual(self.search('паст!'), [self.pasta.id])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_rename_updates_index(self):
+        self.soup.name = 'Грибной суп'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup.save()
+        self.assertEqual(self.search('грибной'), [self.soup.id])
+        self.assertEqual(self.search('томатный'), [self.salad.id])
+
+    def test_deleted_recipe_is_not_found(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pasta.delete()
+        self.assertEqual(self.search('паста'), [])
@@ -0,0 +1,167 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCartIngredient)
+from users.models import User
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='pw')
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        cls.first = Ingredient.objects.create(
+            name='мука', measurement_unit='г')
+        cls.second = Ingredient.objects.create(
+            name='сахар', measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, amounts, author=None):
+        recipe = Recipe.objects.create(
+            author=author or self.author, name='recipe', text='text',
+            cooking_time=5)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in amounts.items())
+        return recipe
+
+    def cart(self, user=None):
+        return dict(ShoppingCartIngredient.objects.filter(
+            user=user or self.user).values_list(
+            'ingredient_id', 'total_amount'))
+
+
+class ShoppingCartEtagTest(ShoppingCartTestCase):
+
+    def etag(self):
+        response = self.client.get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_etag_changes_when_amounts_are_swapped(self):
+        ShoppingCartIngredient.objects.create(
+            user=self.user, ingredient=self.first, total_amount=100)
+        ShoppingCartIngredient.objects.create(
+            user=self.user, ingredient=self.second, total_amount=200)
+        etag = self.etag()
+        ShoppingCartIngredient.objects.filter(
+            ingredient=self.first).update(total_amount=200)
+        ShoppingCartIngredient.objects.filter(
+            ingredient=self.second).update(total_amount=100)
+        self.assertNotEqual(self.etag(), etag)
+        response = self.client.get(DOWNLOAD_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_ingredient_is_renamed(self):
+        ShoppingCartIngredient.objects.create(
+            user=self.user, ingredient=self.first, total_amount=100)
+        etag = self.etag()
+        Ingredient.objects.filter(id=self.first.id).update(name='мука в/с')
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_unchanged_cart_is_not_modified(self):
+        ShoppingCartIngredient.objects.create(
+            user=self.user, ingredient=self.first, total_amount=100)
+        response = self.client.get(
+            DOWNLOAD_URL, HTTP_IF_NONE_MATCH=self.etag())
+        self.assertEqual(response.status_code, 304)
+
+
+class ShoppingCartAggregateTest(ShoppingCartTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe({self.first: 100, self.second: 300})
+
+    def add_to_cart(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_api_add_and_remove(self):
+        self.add_to_cart(self.recipe)
+        self.assertEqual(self.cart(), {self.first.id: 100,
+                                       self.second.id: 300})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.assertEqual(self.cart(), {})
+
+    def test_author_deletion_releases_cart(self):
+        self.add_to_cart(self.recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.delete()
+        self.assertEqual(self.cart(), {})
+
+    def test_recipe_deletion_releases_cart(self):
+        other = self.create_recipe({self.first: 50})
+        self.add_to_cart(self.recipe)
+        self.add_to_cart(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(id=self.recipe.id).delete()
+        self.assertEqual(self.cart(), {self.first.id: 50})
+
+    def test_ingredient_row_edit_updates_cart(self):
+        self.add_to_cart(self.recipe)
+        row = IngredientRecipe.objects.get(
+            recipe=self.recipe, ingredient=self.first)
+        row.amount = 999
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+        self.assertEqual(self.cart(), {self.first.id: 999,
+                                       self.second.id: 300})
+        with self.captureOnCommitCallbacks(execute=True):
+            row.delete()
+        self.assertEqual(self.cart(), {self.second.id: 300})
+
+    def test_apply_amounts_accumulates_existing_rows(self):
+        ShoppingCartIngredient.objects.apply_amounts(
+            {self.user.id: 2}, {self.first.id: 10})
+        ShoppingCartIngredient.objects.apply_amounts(
+            {self.user.id: 1}, {self.first.id: 5, self.second.id: 7})
+        self.assertEqual(self.cart(), {self.first.id: 25,
+                                       self.second.id: 7})
+        ShoppingCartIngredient.objects.apply_amounts(
+            {self.user.id: -1}, {self.first.id: 25, self.second.id: 1})
+        self.assertEqual(self.cart(), {self.second.id: 6})
+
+    def test_multiplier_change_applies_delta(self):
+        self.add_to_cart(self.recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/shopping_cart/',
+                {'multiplier': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart(), {self.first.id: 300,
+                                       self.second.id: 900})
+
+    def test_removal_keeps_other_rows(self):
+        self.add_to_cart(self.recipe)
+        other = Ingredient.objects.create(name='соль', measurement_unit='г')
+        ShoppingCartIngredient.objects.create(
+            user=self.user, ingredient=other, total_amount=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.assertEqual(self.cart(), {other.id: 5})
+
+    def test_rebuild_with_shared_recipe(self):
+        self.add_to_cart(self.recipe)
+        self.client.force_authenticate(self.author)
+        self.add_to_cart(self.recipe)
+        ShoppingCartIngredient.objects.rebuild([self.user.id])
+        self.assertEqual(self.cart(), {self.first.id: 100,
+                                       self.second.id: 300})
+        self.assertEqual(self.cart(self.author), {self.first.id: 100,
+                                                  self.second.id: 300})
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.serializers import RecipeSnapshotSerializer
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+from users.models import User
+
+
+class IngredientRecipeSnapshotTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+        self.recipe = Recipe.objects.create(
+            author=author, name='recipe', text='text', cooking_time=5)
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+        self.row = IngredientRecipe.objects.create(
+            recipe=self.recipe, ingredient=ingredient, amount=10)
+        RecipeSnapshotSerializer.store([self.recipe])
+        self.client = APIClient()
+
+    def ingredients(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return [(row['name'], row['amount'])
+                for row in response.data['ingredients']]
+
+    def test_amount_change_refreshes_detail(self):
+        self.assertEqual(self.ingredients(), [('соль', 10)])
+        self.row.amount = 25
+        with self.captureOnCommitCallbacks(execute=True):
+            self.row.save()
+        self.assertEqual(self.ingredients(), [('соль', 25)])
+
+    def test_row_delete_refreshes_detail(self):
+        self.assertEqual(self.ingredients(), [('соль', 10)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.row.delete()
+        self.assertEqual(self.ingredients(), [])
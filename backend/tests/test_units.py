@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class IngredientUnitLinkTest(TestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grams = Ingredient.objects.create(
+                name='мука', measurement_unit='г')
+            self.other = Ingredient.objects.create(
+                name='сахар', measurement_unit='кг')
+
+    def test_saved_ingredient_links_to_its_base(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            kilos = Ingredient.objects.create(
+                name='мука', measurement_unit='кг')
+        kilos.refresh_from_db()
+        self.assertEqual(kilos.base_id, self.grams.id)
+        self.assertEqual(kilos.base_factor, 1000)
+
+    def test_relink_only_touches_rows_with_the_same_name(self):
+        Ingredient.objects.filter(id=self.other.id).update(base_factor=7)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='мука', measurement_unit='кг')
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.base_factor, 7)
+
+    def test_renamed_base_releases_its_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            kilos = Ingredient.objects.create(
+                name='мука', measurement_unit='кг')
+        self.grams.name = 'мука ржаная'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grams.save()
+        kilos.refresh_from_db()
+        self.assertIsNone(kilos.base_id)
+        self.assertEqual(kilos.base_factor, 1)
@@ -75,6 +75,10 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=['user', 'author'],
                 name='unique_user_author')]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx')]
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'